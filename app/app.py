@@ -1,28 +1,41 @@
 import datetime
 import json
-from io import StringIO
+import logging
+import os
+import sys
+import threading
+import time
 
+import dash._callback
 import dash_bootstrap_components as dbc
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import yfinance as yf
 from backtest import (
+    backtest,
     gen_CCI_signal,
     gen_MA_signal,
     gen_MACD_signal,
     gen_PSAR_signal,
 )
+from codec import decode_frame, encode_frame
 from components import (
     blank_figure,
     generate_backtest_accordion,
+    generate_backtest_plot,
     generate_CCI_plot,
+    generate_CCI_traces,
     generate_line_chart_and_candlestick,
     generate_list_group_items,
     generate_MA_plot,
+    generate_MA_traces,
     generate_MACD_plot,
+    generate_MACD_traces,
     generate_PSAR_plot,
+    generate_PSAR_traces,
+    generate_replay_card,
     generate_strategy_and_input,
+    patch_indicator_traces,
 )
 from dash import (
     ALL,
@@ -38,8 +51,22 @@ from dash import (
     no_update,
 )
 from dash_bootstrap_templates import load_figure_template
-from flask_caching import Cache
+from data import ohlcv_store
+from flask import Response
+from metrics import metrics, stage, timed_callback
+from plotly.io.json import to_json_plotly
 from plotly.subplots import make_subplots
+from rangecache import RangeCache
+from registry import FrameRegistry
+from replay import load_feed
+from signalcache import cached_signal
+from singleflight import single_flight
+from store import TICKER_PATTERN
+from tieredcache import RECENT_DAYS, TTLS, TieredCache
+
+# Setup of the app from here on, library imports excluded
+boot_started = time.perf_counter()
+logger = logging.getLogger(__name__)
 
 # --------
 # Init app
@@ -50,7 +77,25 @@ load_figure_template("flatly")
 
 external_stylesheets = [dbc.themes.FLATLY, dbc_css, dbc.icons.BOOTSTRAP]
 
-app = Dash(
+
+class TradingSignalDash(Dash):
+    """
+    Dash app whose layout is static, so it is serialized once and the same JSON is
+    served to every page load.
+    """
+
+    _layout_json = None
+
+    def layout_json(self):
+        if self._layout_json is None:
+            self._layout_json = to_json_plotly(self.get_layout())
+        return self._layout_json
+
+    def serve_layout(self):
+        return self.backend.make_response(self.layout_json(), mimetype="application/json")
+
+
+app = TradingSignalDash(
     __name__,
     title="Trading Signal",
     external_stylesheets=external_stylesheets,
@@ -58,16 +103,63 @@ app = Dash(
 )
 
 
-cache = Cache(
-    app.server,
-    config={
-        "CACHE_TYPE": "filesystem",
-        "CACHE_DIR": ".cache-directory",
-        # Threshold based on number of CSV files to cache
-        "CACHE_THRESHOLD": 10,
-    },
+# Downloaded bars cached by size: a hot in-process tier backed by compressed files
+# shared between workers, historical bars never expiring
+cache = TieredCache(max_bytes=256 * 1024**2)
+
+# Requests slower than this many seconds are logged with their stage breakdown
+if os.environ.get("SLOW_REQUEST_SECONDS"):
+    metrics.slow_request_seconds = float(os.environ["SLOW_REQUEST_SECONDS"])
+
+
+@app.server.before_request
+def start_request_timer():
+    metrics.start_request()
+
+
+@app.server.after_request
+def stop_request_timer(response):
+    metrics.finish_request()
+    return response
+
+
+# Dash serializes a callback's output once the callback has returned, time it as
+# its own stage rather than as part of the dispatch. to_json is private to Dash,
+# so without it serialization simply stays in the dispatch stage
+_dash_to_json = getattr(dash._callback, "to_json", None)
+
+
+def timed_to_json(value):
+    with stage("serialize"):
+        return _dash_to_json(value)
+
+
+if callable(_dash_to_json):
+    dash._callback.to_json = timed_to_json
+else:
+    logger.warning(
+        "dash._callback.to_json not found, serialization is timed as dispatch"
+    )
+
+
+@app.server.route("/metrics")
+def prometheus_metrics():
+    for name, value in cache.stats().items():
+        metrics.set_gauge(f"cache_{name}", value, f"Download cache {name.replace('_', ' ')}.")
+    for name, value in single_flight.stats().items():
+        metrics.set_gauge(
+            f"single_flight_{name}", value, f"Single-flight {name.replace('_', ' ')}."
+        )
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Entries expire by data class, see tieredcache.TTLS. The recent bars are kept
+# apart, so only they expire quickly
+range_cache = RangeCache(
+    ohlcv_store.get,
+    backend=cache,
+    recent_days=RECENT_DAYS,
+    recent_timeout=TTLS["latest"],
 )
-cache.clear()
 
 
 def download_stock(ticker, start_date, end_date=None):
@@ -77,15 +169,69 @@ def download_stock(ticker, start_date, end_date=None):
         start_date = start_date.strftime("%Y-%m-%d")
     if isinstance(end_date, datetime.date):
         end_date = end_date.strftime("%Y-%m-%d")
-
-    # Cache timeout set to 1 day
-    @cache.memoize(timeout=60 * 15)
-    def download_stock_helper(ticker, start_date, end_date):
-        df = yf.download(ticker, start_date, end_date)
-        df.columns = df.columns.get_level_values(0)
-        return df
-
-    return download_stock_helper(ticker, start_date, end_date)
+    # Typed tickers end up as store paths, anything else finds no data
+    if not TICKER_PATTERN.fullmatch(ticker.upper()):
+        return pd.DataFrame()
+
+    # Sub-ranges of cached date ranges are sliced, only the gaps hit the store.
+    # Concurrent requests for the same range, from any worker, share one download
+    with stage("download"):
+        return single_flight.do(
+            f"download:{ticker.upper()}:{start_date}:{end_date}",
+            lambda: range_cache.get(ticker, start_date, end_date),
+        )
+
+
+# Where the df-store frames live: "server" keeps them in the frame registry and
+# only ships a token, "client" ships the frame itself in the compact codec
+DF_STORE_MODE = "server"
+# Downcast float columns of client-side payloads to float32
+DF_STORE_FLOAT32 = False
+
+# Frames live server-side, the df-store only holds their token
+frame_registry = FrameRegistry()
+
+
+def to_store(df, ticker, start_date, end_date):
+    store_data = {
+        "ticker": ticker,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+    }
+    if DF_STORE_MODE == "client":
+        store_data["frame"] = encode_frame(df, float32=DF_STORE_FLOAT32)
+    else:
+        store_data["token"] = frame_registry.put(df)
+    return store_data
+
+
+def from_store(store_data):
+    with stage("decode"):
+        # Client payloads are only decoded when the app ships them, so a client
+        # cannot make the server inflate arbitrary data
+        if DF_STORE_MODE == "client" and "frame" in store_data:
+            return decode_frame(store_data["frame"])
+        if "token" not in store_data and "frame" not in store_data:
+            # The default payload of the layout, loaded on first use
+            return default_frame()
+
+        df = frame_registry.get(store_data.get("token"))
+    if df is None:
+        # Evicted from both tiers, rebuild it from the download cache
+        df = download_stock(
+            store_data["ticker"], store_data["start_date"], store_data["end_date"]
+        )
+        df = df.rename(columns={"Adj Close": "Adj_Close"}).dropna()
+        frame_registry.put(df)
+    return df
+
+
+# Replay of a local OHLCV file in the Visualization tab
+REPLAY_PATH = os.environ.get("REPLAY_PATH", "replay.csv")
+REPLAY_SPEED = float(os.environ.get("REPLAY_SPEED", 1000))  # bars per second
+REPLAY_INTERVAL_MS = 100
+# Bars kept on the replay figures, older ones scroll out
+REPLAY_MAX_POINTS = 5000
 
 
 today = datetime.date.today()
@@ -93,9 +239,69 @@ one_year_ago = today - datetime.timedelta(days=365)
 half_year_ago = today - datetime.timedelta(days=180)
 
 
-df = download_stock("VOO", one_year_ago, half_year_ago)
-df.rename(columns={"Adj Close": "Adj_Close"}, inplace=True)
-df.dropna(inplace=True)
+# The default ticker is loaded on the first request that needs it, from the
+# snapshot written by `python app.py --snapshot` if there is one
+DEFAULT_TICKER = "VOO"
+DEFAULT_SNAPSHOT = os.environ.get("DEFAULT_SNAPSHOT", "default-snapshot.pkl")
+
+default_store_data = {
+    "ticker": DEFAULT_TICKER,
+    "start_date": str(one_year_ago),
+    "end_date": str(half_year_ago),
+}
+_default = {}
+_default_lock = threading.Lock()
+
+
+def default_frame():
+    with _default_lock:
+        if "df" in _default:
+            return _default["df"]
+        if os.path.exists(DEFAULT_SNAPSHOT):
+            df = pd.read_pickle(DEFAULT_SNAPSHOT)
+        else:
+            try:
+                df = download_stock(DEFAULT_TICKER, one_year_ago, half_year_ago)
+                df = df.rename(columns={"Adj Close": "Adj_Close"}).dropna()
+            except Exception:
+                logger.exception("Failed to load the default ticker %s", DEFAULT_TICKER)
+                df = pd.DataFrame()
+        # Offline or failed loads are retried on the next call
+        if len(df):
+            _default["df"] = df
+        return df
+
+
+def no_data_chart():
+    fig = go.Figure()
+    fig.update_layout(
+        xaxis={"visible": False},
+        yaxis={"visible": False},
+        annotations=[
+            {
+                "text": "No data available, please try again later",
+                "showarrow": False,
+                "font": {"size": 16},
+            }
+        ],
+    )
+    return dcc.Graph(figure=fig, className="mt-3 mb-3")
+
+
+def default_chart():
+    df = default_frame()
+    if len(df) == 0:
+        return no_data_chart()
+    with _default_lock:
+        if "chart" not in _default:
+            _default["chart"] = generate_line_chart_and_candlestick(df)
+        return _default["chart"]
+
+
+def write_default_snapshot(path=DEFAULT_SNAPSHOT):
+    df = download_stock(DEFAULT_TICKER, one_year_ago, half_year_ago)
+    df.rename(columns={"Adj Close": "Adj_Close"}).dropna().to_pickle(path)
+
 
 # --------
 # Components
@@ -122,7 +328,7 @@ navbar = dbc.Navbar(
     dark=True,
 )
 
-INDICATOR_LIST = ["Chart Analysis", "Moving Average (MA)", "MACD", "Parabolic SAR", "CCI"]
+INDICATOR_LIST = ["Chart Analysis", "Moving Average (MA)", "MACD", "Parabolic SAR", "CCI", "Replay"]
 
 list_group_tabs = (
     dbc.ListGroup(
@@ -136,8 +342,6 @@ list_group_tabs = (
     ),
 )
 
-line_candlestick_chart = generate_line_chart_and_candlestick(df)
-
 content = dbc.Row(
     dbc.Col(
         [
@@ -198,7 +402,7 @@ content = dbc.Row(
                                         width=3,
                                     ),
                                     dbc.Col(
-                                        line_candlestick_chart, id="chart", width=9
+                                        dbc.Spinner(), id="chart", width=9
                                     ),
                                 ],
                                 key="main-figure",
@@ -207,6 +411,16 @@ content = dbc.Row(
                         ),
                         label="Visualization",
                     ),
+                    dbc.Tab(
+                        dbc.Card(
+                            [
+                                generate_backtest_accordion(["MACD", "MA", "PSAR"]),
+                                html.Div(id="backtest-output"),
+                            ],
+                            body=True,
+                        ),
+                        label="Backtest",
+                    ),
                 ]
             ),
         ],
@@ -219,24 +433,37 @@ content = dbc.Row(
 # ----------
 
 
-def serve_layout():
-    return html.Div(
-        [
-            navbar,
-            dcc.Store(
-                id="df-store",
-                data=df.to_json(date_format="iso", orient="split"),
-                storage_type="memory",
-            ),
-            dcc.Store(
-                id="ticker-store", data="VOO", storage_type="memory"
-            ),
-            dbc.Container(content, fluid=True, className="ps-5 pe-5"),
-        ]
-    )
+layout = html.Div(
+    [
+        navbar,
+        dcc.Store(
+            id="df-store",
+            data=default_store_data,
+            storage_type="memory",
+        ),
+        dcc.Store(
+            id="ticker-store", data=DEFAULT_TICKER, storage_type="memory"
+        ),
+        dbc.Container(content, fluid=True, className="ps-5 pe-5"),
+    ]
+)
+
+
+app.layout = layout
+# Serialize the layout while booting rather than on the first page load
+app.layout_json()
 
 
-app.layout = serve_layout
+@app.callback(
+    Output("chart", "children", allow_duplicate=True),
+    Input("chart", "id"),
+    prevent_initial_call="initial_duplicate",
+)
+@timed_callback
+def load_default_chart(_):
+    # Filled in once the page is up, so workers boot without any data
+    with stage("figure"):
+        return default_chart()
 
 
 @app.callback(
@@ -244,6 +471,7 @@ app.layout = serve_layout
     Input({"type": "lg", "index": ALL}, "n_clicks"),
     prevent_initial_call=True,
 )
+@timed_callback
 def change_active(n_clicks):
     ctx = callback_context
     input_id = json.loads(ctx.triggered[0]["prop_id"].split(".")[0])
@@ -271,6 +499,7 @@ def change_active(n_clicks):
     State({"type": "lg", "index": ALL}, "active"),
     prevent_initial_call=True,
 )
+@timed_callback
 def set_ticker_df(
     start_date,
     end_date,
@@ -286,15 +515,19 @@ def set_ticker_df(
     curr_period = (datetime.datetime.strptime(end_date, "%Y-%m-%d") - datetime.datetime.strptime(start_date, "%Y-%m-%d")).days
     ticker_title, time_horizon = value, f"({curr_period} days)" if curr_period > 1 else f"({curr_period} day)"
 
-    df = df.rename(columns={"Adj Close": "Adj_Close"}).copy()
-    df = df.dropna()
+    with stage("copy"):
+        df = df.rename(columns={"Adj Close": "Adj_Close"}).copy()
+        df = df.dropna()
+
+    with stage("figure"):
+        chart = generate_line_chart_and_candlestick(df)
 
     return [
-        df.to_json(date_format="iso", orient="split"),
+        to_store(df, value, start_date, end_date),
         ticker_title,
         time_horizon,
         f"Data as of {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.",
-        generate_line_chart_and_candlestick(df),
+        chart,
         [True if not i else False for i in range(len(active_list))],
         updated_ticker,
         False
@@ -307,58 +540,14 @@ def set_ticker_df(
     State("df-store", "data"),
     prevent_initial_call=True,
 )
-def generate_chart_analysis_content(n_clicks, json_df):
-    # Read the JSON data into a pandas DataFrame
-    df = pd.read_json(StringIO(json_df), orient="split")
-    df_copy = df.copy()
-    fig = make_subplots(
-        rows=2, cols=1, row_heights=[0.7, 0.3], shared_xaxes=True, vertical_spacing=0.02
-    )
-    fig.add_trace(
-        go.Scatter(x=df_copy.index, y=df_copy["Close"], mode="lines", name="Close"),
-        row=1,
-        col=1,
-    )
-    fig.add_trace(
-        go.Bar(
-            x=df_copy.index,
-            y=df_copy["Volume"],
-            marker=dict(color="rgba(255, 0, 0, 0.9)"),
-            name="Volume",
-        ),
-        row=2,
-        col=1,
-    )
-
-    #  spike line hover extended to all subplots
-    fig.update_layout(hovermode="x unified")
-    # Update y-axis titles for the subplots
-    fig.update_yaxes(title_text="Price ($)", row=1, col=1)
-    fig.update_yaxes(title_text="Volume (unit)", row=2, col=1)
-    fig.update_traces(xaxis="x1")
-
-    fig2 = go.Figure(
-        data=[
-            go.Candlestick(
-                x=df_copy.index,
-                open=df_copy["Open"],
-                high=df_copy["High"],
-                low=df_copy["Low"],
-                close=df_copy["Close"],
-            )
-        ]
-    )
-    fig2.update_layout(yaxis=dict(title="Price ($)"))
-    return dbc.Card(
-        [
-            html.H3("Line Chart", className="ms-3"),
-            dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3")),
-            html.H3("Candlestick Chart", className="ms-3"),
-            dbc.Spinner(dcc.Graph(figure=fig2, className="mt-3 mb-3")),
-        ],
-        body=True,
-        className="mt-3",
-    )
+@timed_callback
+def generate_chart_analysis_content(n_clicks, store_data):
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) == 0:
+        return no_data_chart()
+    with stage("figure"):
+        return generate_line_chart_and_candlestick(df)
 
 
 @app.callback(
@@ -367,35 +556,38 @@ def generate_chart_analysis_content(n_clicks, json_df):
     State("df-store", "data"),
     prevent_initial_call=True,
 )
-def generate_MACD_content(n_clicks, json_df):
-    # Read the JSON data into a pandas DataFrame
-    df = pd.read_json(StringIO(json_df), orient="split")
-    df_copy = df.copy()
-    # Get adjusted close column
-    return generate_MACD_plot(df_copy)
+@timed_callback
+def generate_MACD_content(n_clicks, store_data):
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) == 0:
+        return no_data_chart()
+    with stage("figure"):
+        return generate_MACD_plot(df)
 
 
 @app.callback(
-    Output("chart", "children", allow_duplicate=True),
+    Output("indicator-graph", "figure", allow_duplicate=True),
     Input({"type": "macd-param", "index": ALL}, "value"),
     State("df-store", "data"),
-    State("chart", "children"),
     prevent_initial_call=True,
 )
-def change_MACD_param(MACD_param, json_df, prev_figure):
+@timed_callback
+def change_MACD_param(MACD_param, store_data):
     # Catch exception when users are typing the input for the MACD settings
-    # Return previous figure if there is any exception
+    # Keep the current figure if there is any exception
     try:
-        # Read the JSON data into a pandas DataFrame
-        df = pd.read_json(StringIO(json_df), orient="split")
-        df_copy = df.copy()
+        # Fetch the frame behind the df-store payload
+        df = from_store(store_data)
         a, b, c = MACD_param
 
-        new_figure = generate_MACD_plot(df_copy, a, b, c)
-        return new_figure
+        # Only the indicator and signal traces are sent back
+        with stage("figure"):
+            traces = generate_MACD_traces(df, a, b, c)
+            return patch_indicator_traces(traces)
 
     except Exception:
-        return prev_figure
+        return no_update
 
 
 @app.callback(
@@ -404,35 +596,38 @@ def change_MACD_param(MACD_param, json_df, prev_figure):
     State("df-store", "data"),
     prevent_initial_call=True,
 )
-def generate_MA_content(n_clicks, json_df):
-    # Read the JSON data into a pandas DataFrame
-    df = pd.read_json(StringIO(json_df), orient="split")
-    df_copy = df.copy()
-    # Get adjusted close column
-    return generate_MA_plot(df_copy)
+@timed_callback
+def generate_MA_content(n_clicks, store_data):
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) == 0:
+        return no_data_chart()
+    with stage("figure"):
+        return generate_MA_plot(df)
 
 
 @app.callback(
-    Output("chart", "children", allow_duplicate=True),
+    Output("indicator-graph", "figure", allow_duplicate=True),
     Input({"type": "ma-param", "index": ALL}, "value"),
     State("df-store", "data"),
-    State("chart", "children"),
     prevent_initial_call=True,
 )
-def change_MA_param(MA_param, json_df, prev_figure):
-    # Catch exception when users are typing the input for the MACD settings
-    # Return previous figure if there is any exception
+@timed_callback
+def change_MA_param(MA_param, store_data):
+    # Catch exception when users are typing the input for the MA settings
+    # Keep the current figure if there is any exception
     try:
-        # Read the JSON data into a pandas DataFrame
-        df = pd.read_json(StringIO(json_df), orient="split")
-        df_copy = df.copy()
+        # Fetch the frame behind the df-store payload
+        df = from_store(store_data)
         short_window, long_window = MA_param
 
-        new_figure = generate_MA_plot(df_copy, short_window, long_window)
-        return new_figure
+        # Only the indicator and signal traces are sent back
+        with stage("figure"):
+            traces = generate_MA_traces(df, short_window, long_window)
+            return patch_indicator_traces(traces)
 
     except Exception:
-        return prev_figure
+        return no_update
 
 
 @app.callback(
@@ -441,35 +636,38 @@ def change_MA_param(MA_param, json_df, prev_figure):
     State("df-store", "data"),
     prevent_initial_call=True,
 )
-def generate_PSAR_content(n_clicks, json_df):
-    # Read the JSON data into a pandas DataFrame
-    df = pd.read_json(StringIO(json_df), orient="split")
-    df_copy = df.copy()
-    # Get adjusted close column
-    return generate_PSAR_plot(df_copy)
+@timed_callback
+def generate_PSAR_content(n_clicks, store_data):
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) == 0:
+        return no_data_chart()
+    with stage("figure"):
+        return generate_PSAR_plot(df)
 
 
 @app.callback(
-    Output("chart", "children", allow_duplicate=True),
+    Output("indicator-graph", "figure", allow_duplicate=True),
     Input({"type": "psar-param", "index": ALL}, "value"),
     State("df-store", "data"),
-    State("chart", "children"),
     prevent_initial_call=True,
 )
-def change_PSAR_param(PSAR_param, json_df, prev_figure):
-    # Catch exception when users are typing the input for the MACD settings
-    # Return previous figure if there is any exception
+@timed_callback
+def change_PSAR_param(PSAR_param, store_data):
+    # Catch exception when users are typing the input for the PSAR settings
+    # Keep the current figure if there is any exception
     try:
-        # Read the JSON data into a pandas DataFrame
-        df = pd.read_json(StringIO(json_df), orient="split")
-        df_copy = df.copy()
+        # Fetch the frame behind the df-store payload
+        df = from_store(store_data)
         initial_af, max_af = PSAR_param
 
-        new_figure = generate_PSAR_plot(df_copy, initial_af, max_af)
-        return new_figure
+        # Only the indicator and signal traces are sent back
+        with stage("figure"):
+            traces = generate_PSAR_traces(df, initial_af, max_af)
+            return patch_indicator_traces(traces)
 
     except Exception:
-        return prev_figure
+        return no_update
 
 
 @app.callback(
@@ -478,128 +676,222 @@ def change_PSAR_param(PSAR_param, json_df, prev_figure):
     State("df-store", "data"),
     prevent_initial_call=True,
 )
-def generate_CCI_content(n_clicks, json_df):
-    # Read the JSON data into a pandas DataFrame
-    df = pd.read_json(StringIO(json_df), orient="split")
-    df_copy = df.copy()
-    # Get adjusted close column
-    return generate_CCI_plot(df_copy)
+@timed_callback
+def generate_CCI_content(n_clicks, store_data):
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) == 0:
+        return no_data_chart()
+    with stage("figure"):
+        return generate_CCI_plot(df)
 
 
 @app.callback(
-    Output("chart", "children", allow_duplicate=True),
+    Output("indicator-graph", "figure", allow_duplicate=True),
     Input({"type": "cci-param", "index": ALL}, "value"),
     State("df-store", "data"),
-    State("chart", "children"),
     prevent_initial_call=True,
 )
-def change_CCI_param(CCI_param, json_df, prev_figure):
-    # Catch exception when users are typing the input for the MACD settings
-    # Return previous figure if there is any exception
+@timed_callback
+def change_CCI_param(CCI_param, store_data):
+    # Catch exception when users are typing the input for the CCI settings
+    # Keep the current figure if there is any exception
     try:
-        # Read the JSON data into a pandas DataFrame
-        df = pd.read_json(StringIO(json_df), orient="split")
-        df_copy = df.copy()
+        # Fetch the frame behind the df-store payload
+        df = from_store(store_data)
         window_size, constant = CCI_param
 
-        new_figure = generate_CCI_plot(df_copy, window_size, constant)
-        return new_figure
+        # Only the indicator and signal traces are sent back
+        with stage("figure"):
+            traces = generate_CCI_traces(df, window_size, constant)
+            return patch_indicator_traces(traces)
+
+    except Exception:
+        return no_update
+
+
+@app.callback(
+    Output("chart", "children", allow_duplicate=True),
+    Input({"type": "lg", "index": INDICATOR_LIST.index("Replay")+1}, "n_clicks"),
+    prevent_initial_call=True,
+)
+@timed_callback
+def generate_replay_content(n_clicks):
+    if not os.path.exists(REPLAY_PATH):
+        return dbc.Alert(
+            f"No replay file found at {REPLAY_PATH}.",
+            color="warning",
+            className="mt-3",
+        )
+    return generate_replay_card(REPLAY_PATH, REPLAY_SPEED, REPLAY_INTERVAL_MS)
 
+
+@app.callback(
+    Output("replay-line-graph", "extendData"),
+    Output("replay-candlestick-graph", "extendData"),
+    Output("replay-state", "data"),
+    Output("replay-clock", "data"),
+    Output("replay-interval", "disabled"),
+    Input("replay-interval", "n_intervals"),
+    State("replay-state", "data"),
+)
+@timed_callback
+def stream_replay_bars(n_intervals, replay_state):
+    feed = load_feed(REPLAY_PATH)
+    now = time.time()
+    if replay_state is None:
+        replay_state = {"started_at": now, "cursor": 0}
+
+    # Only the bars that fell due since the last poll are sent
+    start = replay_state["cursor"]
+    stop = feed.due(replay_state["started_at"], REPLAY_SPEED, now)
+    finished = stop >= len(feed)
+    if stop <= start:
+        return no_update, no_update, replay_state, no_update, finished
+
+    line, candlestick = feed.extend_data(start, stop, REPLAY_MAX_POINTS)
+    clock = {
+        "sent_at": time.time() * 1000,
+        "due_at": feed.due_at(replay_state["started_at"], REPLAY_SPEED, stop) * 1000,
+        "bars": stop,
+        "started_at": replay_state["started_at"] * 1000,
+    }
+    replay_state = dict(replay_state, cursor=stop)
+    return line, candlestick, replay_state, clock, finished
+
+
+# Latency is measured in the browser against the server clock, so it assumes
+# both clocks agree, as they do when replaying locally
+app.clientside_callback(
+    """
+    function(clock) {
+        if (!clock) {
+            return window.dash_clientside.no_update;
+        }
+        const now = Date.now();
+        const stats = (window.replayLatency = window.replayLatency || []);
+        stats.push([now - clock.sent_at, now - clock.due_at]);
+        if (stats.length > 500) {
+            stats.shift();
+        }
+        const pct = (i, q) => {
+            const sorted = stats.map((s) => s[i]).sort((a, b) => a - b);
+            return sorted[Math.floor(q * (sorted.length - 1))].toFixed(0);
+        };
+        const rate = (clock.bars / ((now - clock.started_at) / 1000)).toFixed(0);
+        return `${clock.bars} bars, ${rate} bars/s. ` +
+            `Server to browser: p50 ${pct(0, 0.5)} ms, p95 ${pct(0, 0.95)} ms. ` +
+            `Bar due to browser: p50 ${pct(1, 0.5)} ms, p95 ${pct(1, 0.95)} ms.`;
+    }
+    """,
+    Output("replay-latency", "children"),
+    Input("replay-clock", "data"),
+)
+
+
+@app.callback(
+    Output("backtest-output", "children"),
+    Input("backtest-strategy-button", "n_clicks"),
+    State("strategy-dropdown", "value"),
+    State({"type": "backtest-MACD-param", "index": ALL}, "value"),
+    State({"type": "backtest-MA-param", "index": ALL}, "value"),
+    State({"type": "backtest-PSAR-param", "index": ALL}, "value"),
+    State({"type": "backtest-CCI-param", "index": ALL}, "value"),
+    State("df-store", "data"),
+    prevent_initial_call=True,
+)
+@timed_callback
+def generate_backtest_chart(
+    n_clicks, strategy_list, MACD_param, MA_param, PSAR_param, CCI_param, store_data
+):
+    strategy_param = {
+        "MACD": MACD_param,
+        "MA": MA_param,
+        "PSAR": PSAR_param,
+        "CCI": CCI_param,
+    }
+    strategy_param = {strat: strategy_param[strat] for strat in strategy_list or []}
+
+    if not strategy_param or any(
+        val is None for param in strategy_param.values() for val in param
+    ):
+        return dbc.Alert(
+            "Please specify all the strategy parameters.",
+            is_open=True,
+            duration=5000,
+            className="mt-3 mb-3 ms-3 me-3",
+        )
+
+    # Fetch the frame behind the df-store payload
+    df = from_store(store_data)
+    if len(df) < 2:
+        return dbc.Alert(
+            "Not enough data to backtest, please pick a longer period.",
+            is_open=True,
+            duration=5000,
+            className="mt-3 mb-3 ms-3 me-3",
+        )
+
+    # Signals come from the same cache as the indicator views
+    try:
+        X = np.column_stack(
+            [
+                cached_signal(strat, df, *param)["Buy_Signal"].to_numpy()
+                for strat, param in strategy_param.items()
+            ]
+        )
     except Exception:
-        return prev_figure
-
-
-# @app.callback(
-#     Output("backtest-output", "children", allow_duplicate=True),
-#     Input("backtest-strategy-button", "n_clicks"),
-#     State("strategy-dropdown", "value"),
-#     State("strategy-param", "children"),
-#     State("df-store", "data"),
-#     prevent_initial_call=True,
-# )
-# def generate_backtest_chart(n_clicks, strategy_list, strategy_param_component, json_df):
-#     # Read the JSON data into a pandas DataFrame
-#     df = pd.read_json(StringIO(json_df), orient="split").copy()
-#     df["Return"] = df["Close"] / df["Close"].shift(1)
-#     df["Buy_Signal"] = np.where(df["Return"] > 1, 1, 0)
-#     df.dropna(inplace=True)
-#     strategy_param = {strat: [] for strat in strategy_list}
-
-#     try:
-#         for ele in strategy_param_component:
-#             for idx in range(len(ele["props"]["children"])):
-#                 strat = ele["props"]["children"][idx]["props"]["children"][1]["props"][
-#                     "id"
-#                 ]["type"].split("-")[1]
-#                 val = ele["props"]["children"][idx]["props"]["children"][1]["props"][
-#                     "value"
-#                 ]
-#                 strategy_param[strat].append(val)
-#     except KeyError:
-#         print(strategy_param)
-#         return dbc.Alert(
-#             "Please specify all the strategy parameters.",
-#             is_open=True,
-#             duration=5000,
-#             className="mt-3 mb-3 ms-3 me-3",
-#         )
-#     else:
-#         print(strategy_param)
-#         buy_signal_series = []
-#         for strat in strategy_param:
-#             if strat == "MACD":
-#                 df_copy = df.copy()
-#                 buy_signal_series.append(
-#                     gen_MACD_signal(df_copy, *strategy_param[strat])[
-#                         "Buy_Signal"
-#                     ].tolist()
-#                 )
-#             if strat == "MA":
-#                 df_copy = df.copy()
-#                 buy_signal_series.append(
-#                     gen_MA_signal(df_copy, *strategy_param[strat])[
-#                         "Buy_Signal"
-#                     ].tolist()
-#                 )
-#             if strat == "PSAR":
-#                 df_copy = df.copy()
-#                 buy_signal_series.append(
-#                     gen_PSAR_signal(df_copy, *strategy_param[strat])[
-#                         "Buy_Signal"
-#                     ].tolist()
-#                 )
-
-#         X = np.column_stack(buy_signal_series)
-#         num_column = X.shape[1]
-#         # Perform majority voting along the left columns
-#         majority_vote = np.sum(X, axis=1)
-
-#         # Define a threshold for majority voting
-#         threshold = (
-#             2 / 3 * num_column
-#         )  # Adjust as needed, for example, if 2 out of 3 are True, it's considered a majority
-#         print(f"Threshold: {threshold}")
-
-#         # Create the new column based on the majority voting result
-#         new_column = (majority_vote >= threshold).astype(int)
-
-#         df["Buy_Signal_Predict"] = new_column
-
-#         portfolio, fig = backtest(df)
-#         # print(portfolio.tail(20))
-#         return dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3"))
-
-
-# @app.callback(
-#     Output("strategy-and-input", "children"),
-#     Input("strategy-dropdown", "value"),
-#     prevent_initial_call=True,
-# )
-# def test_strategy(strategy_values):
-#     strategy_and_input = generate_strategy_and_input(strategy_values)
-
-#     return strategy_and_input
+        return dbc.Alert(
+            "Please specify valid strategy parameters.",
+            is_open=True,
+            duration=5000,
+            className="mt-3 mb-3 ms-3 me-3",
+        )
+    num_column = X.shape[1]
+    # Perform majority voting along the left columns
+    majority_vote = np.sum(X, axis=1)
+
+    # Define a threshold for majority voting
+    threshold = (
+        2 / 3 * num_column
+    )  # Adjust as needed, for example, if 2 out of 3 are True, it's considered a majority
+
+    with stage("copy"):
+        df = df.copy()
+    df["Buy_Signal_Predict"] = (majority_vote >= threshold).astype(int)
+
+    with stage("backtest"):
+        portfolio = backtest(df)
+    with stage("figure"):
+        return dbc.Spinner(generate_backtest_plot(portfolio))
+
+
+@app.callback(
+    Output("strategy-and-input", "children"),
+    Input("strategy-dropdown", "value"),
+    prevent_initial_call=True,
+)
+@timed_callback
+def test_strategy(strategy_values):
+    strategy_and_input = generate_strategy_and_input(strategy_values)
+
+    return strategy_and_input
+
+
+boot_seconds = time.perf_counter() - boot_started
+metrics.set_gauge("boot_seconds", boot_seconds, "Time the app took to set up.")
+metrics.set_gauge(
+    "boot_cpu_seconds",
+    time.process_time(),
+    "CPU time of the process once set up, imports included.",
+)
+logger.info(
+    "Booted in %.3fs, %.3fs of CPU with imports", boot_seconds, time.process_time()
+)
 
 
 if __name__ == "__main__":
-    app.run()
+    if "--snapshot" in sys.argv[1:]:
+        write_default_snapshot()
+    else:
+        app.run()
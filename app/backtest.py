@@ -1,3 +1,4 @@
+import kernels
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
@@ -19,6 +20,48 @@ def gen_MACD_signal(df, a, b, c):
     return df
 
 
+def gen_MACD_signal_grid(close, triples):
+    """
+    MACD signals for many (a, b, c) parameter triples in one sweep.
+
+    Every distinct span's EMA is computed once in a single recursive pass, and the
+    MACD lines and their signal lines are shared between triples that reuse them.
+
+    Parameters:
+    - close (pd.Series or np.ndarray): Close prices of shape (n_bars,).
+    - triples (list): (a, b, c) tuples, as passed to gen_MACD_signal.
+
+    Returns:
+    - macd, signal_line (np.ndarray): float64 arrays of shape (n_triples, n_bars).
+    - buy_signal (np.ndarray): Boolean array of shape (n_triples, n_bars).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    triples = np.asarray(triples, dtype=np.float64).reshape(-1, 3)
+
+    spans, span_idx = np.unique(triples[:, :2], return_inverse=True)
+    span_idx = span_idx.reshape(-1, 2)
+    ema = kernels.ewm_mean(close, spans)
+
+    pairs, pair_idx = np.unique(span_idx, axis=0, return_inverse=True)
+    pair_idx = pair_idx.reshape(-1)
+    macd_lines = ema[pairs[:, 0]] - ema[pairs[:, 1]]
+
+    # Smooth each distinct (MACD line, signal span) combination once
+    combos, combo_idx = np.unique(
+        np.column_stack([pair_idx, triples[:, 2]]), axis=0, return_inverse=True
+    )
+    combo_idx = combo_idx.reshape(-1)
+    signal_lines = kernels.ewm_mean_rows(
+        macd_lines[combos[:, 0].astype(np.int64)], combos[:, 1]
+    )
+
+    macd = macd_lines[pair_idx]
+    signal_line = signal_lines[combo_idx]
+    buy_signal = macd > signal_line
+
+    return macd, signal_line, buy_signal
+
+
 def gen_MA_signal(df, short_window=40, long_window=100):
     df = df.copy()
     close = df["Close"]
@@ -36,84 +79,53 @@ def gen_MA_signal(df, short_window=40, long_window=100):
     return df
 
 
+def gen_MA_signal_grid(close, short_windows, long_windows, packed=False):
+    """
+    Moving average crossover signals for every (short_window, long_window) pair.
+
+    Each distinct window's rolling mean is computed once from a shared prefix sum,
+    with the same min_periods=1 semantics as gen_MA_signal.
+
+    Parameters:
+    - close (pd.Series or np.ndarray): Close prices of shape (n_bars,).
+    - short_windows, long_windows (list): Window lengths to sweep.
+    - packed (bool): Pack the signal tensor along the bar axis with np.packbits.
+
+    Returns:
+    - short_ma (np.ndarray): Rolling means of shape (n_short, n_bars).
+    - long_ma (np.ndarray): Rolling means of shape (n_long, n_bars).
+    - buy_signal (np.ndarray): Boolean tensor of shape (n_short, n_long, n_bars), or
+                               uint8 of shape (n_short, n_long, ceil(n_bars / 8))
+                               when packed.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    short_windows = np.atleast_1d(np.asarray(short_windows, dtype=np.int64))
+    long_windows = np.atleast_1d(np.asarray(long_windows, dtype=np.int64))
+
+    windows, inverse = np.unique(
+        np.concatenate([short_windows, long_windows]), return_inverse=True
+    )
+    means = kernels.rolling_mean(close, windows)
+    short_ma = means[inverse[: len(short_windows)]]
+    long_ma = means[inverse[len(short_windows) :]]
+
+    buy_signal = short_ma[:, None, :] > long_ma[None, :, :]
+    if packed:
+        buy_signal = np.packbits(buy_signal, axis=-1)
+
+    return short_ma, long_ma, buy_signal
+
+
 def gen_PSAR_signal(df, initial_af=0.02, max_af=0.2):
     df = df.copy()
-    length = len(df)
-
-    array_high = df["High"].tolist()
-    array_low = df["Low"].tolist()
-
-    psar = df["Close"].copy()
-    psarbull = [None] * len(df)
-    psarbear = [None] * len(df)
-
-    bull = True
-    af = initial_af  # initialise acceleration factor
-
-    if length > 0:
-        ep = array_low[0]  # extreme price
-        hp = array_high[0]  # extreme high
-        lp = array_low[0]  # extreme low
-
-    for i in range(2, len(df)):
-        if bull:
-            # Rising SAR
-            psar[i] = psar[i - 1] + af * (hp - psar[i - 1])
-        else:
-            # Falling SAR
-            psar[i] = psar[i - 1] + af * (lp - psar[i - 1])
-
-        reverse = False
-
-        # Check reversion point
-        if bull:
-            if array_low[i] < psar[i]:
-                bull = False
-                reverse = True
-                psar[i] = hp
-                lp = array_low[i]
-                af = initial_af
-        else:
-            if array_high[i] > psar[i]:
-                bull = True
-                reverse = True
-                psar[i] = lp
-                hp = array_high[i]
-                af = initial_af
-
-        if not reverse:
-            if bull:
-                # Extreme high makes a new high
-                if array_high[i] > hp:
-                    hp = array_high[i]
-                    af = min(af + initial_af, max_af)
-
-                # Check if SAR goes abov prior two periods' lows.
-                # If so, use the lowest of the two for SAR.
-                if array_low[i - 1] < psar[i]:
-                    psar[i] = array_low[i - 1]
-                if array_low[i - 2] < psar[i]:
-                    psar[i] = array_low[i - 2]
-
-            else:
-                # Extreme low makes a new low
-                if array_low[i] < lp:
-                    lp = array_low[i]
-                    af = min(af + initial_af, max_af)
-
-                # Check if SAR goes below prior two periods' highs.
-                # If so, use the highest of the two for SAR.
-                if array_high[i - 1] > psar[i]:
-                    psar[i] = array_high[i - 1]
-                if array_high[i - 2] > psar[i]:
-                    psar[i] = array_high[i - 2]
-
-        # Save rising SAR
-        if bull:
-            psarbull[i] = psar[i]
-        # Save falling SAR
-        else:
-            psarbear[i] = psar[i]
+
+    psar, psarbull, psarbear = kernels.psar(
+        df["High"].to_numpy(dtype=np.float64),
+        df["Low"].to_numpy(dtype=np.float64),
+        df["Close"].to_numpy(dtype=np.float64),
+        initial_af,
+        max_af,
+    )
 
     df["psar"] = psar
     df["psarbull"] = psarbull
@@ -130,7 +142,20 @@ def gen_PSAR_signal(df, initial_af=0.02, max_af=0.2):
     return df
 
 
-def gen_CCI_signal(df, window_size=20, constant=0.015):
+def gen_CCI_signal(df, window_size=20, constant=0.015, deviation="std"):
+    """
+    CCI buy signals from the typical price.
+
+    Parameters:
+    - df (pd.DataFrame): Frame with "High", "Low" and "Close" columns.
+    - window_size (int): Rolling window of the mean and the deviation.
+    - constant (float): Scaling constant of the CCI.
+    - deviation (str): "std" divides by the rolling standard deviation, as this
+                       strategy always has, "mad" by the rolling mean absolute
+                       deviation of the textbook CCI.
+    """
+    if deviation not in ("std", "mad"):
+        raise ValueError('deviation must be "std" or "mad"')
     df = df.copy()
     df["Typical Price"] = (df["High"] + df["Low"] + df["Close"]) / 3
 
@@ -140,11 +165,18 @@ def gen_CCI_signal(df, window_size=20, constant=0.015):
         .mean()
     )
 
-    df["Mean Deviation"] = (
-        df["Typical Price"]
-        .rolling(window=window_size, min_periods=1, center=False)
-        .std()
-    )
+    if deviation == "mad":
+        df["Mean Deviation"] = kernels.rolling_mean_deviation(
+            df["Typical Price"].to_numpy(dtype=np.float64),
+            window_size,
+            means=df["SMA"].to_numpy(dtype=np.float64)[None],
+        )[0]
+    else:
+        df["Mean Deviation"] = (
+            df["Typical Price"]
+            .rolling(window=window_size, min_periods=1, center=False)
+            .std()
+        )
 
     df["CCI"] = (df["Typical Price"] - df["SMA"]) / (constant * df["Mean Deviation"])
 
@@ -153,4 +185,36 @@ def gen_CCI_signal(df, window_size=20, constant=0.015):
     # Convert boolean values to True/False
     df["Buy_Signal"] = df["Buy_Signal"].astype(bool)
 
-    return df
\ No newline at end of file
+    return df
+
+
+def backtest(df, initial_capital=100000.0, shares=100):
+    """
+    Vectorized backtest of the Buy_Signal_Predict column against the Close prices.
+
+    Parameters:
+    - df (pd.DataFrame): Frame with "Close" and "Buy_Signal_Predict" columns.
+    - initial_capital (float): Starting cash.
+    - shares (int): Number of shares held while the predicted signal is on.
+
+    Returns:
+    - portfolio (pd.DataFrame): Frame on the index of df with positions, holdings, cash,
+                                total and returns columns, as used by evaluate.py.
+    """
+    positions, holdings, cash, total, returns = kernels.simulate_portfolio(
+        df["Buy_Signal_Predict"].to_numpy(),
+        df["Close"].to_numpy(),
+        initial_capital,
+        shares,
+    )
+
+    return pd.DataFrame(
+        {
+            "positions": positions,
+            "holdings": holdings,
+            "cash": cash,
+            "total": total,
+            "returns": returns,
+        },
+        index=df.index,
+    )
@@ -0,0 +1,305 @@
+# -------------
+# Benchmarks of the signal functions, metrics and figure builders on synthetic OHLCV.
+#
+#   python bench.py                             time every case at every size
+#   python bench.py --sizes 1000 100000 --only MACD
+#   python bench.py --save bench_baseline.json  store the results as the baseline
+#   python bench.py --baseline bench_baseline.json
+#
+# With a baseline, any case slower or hungrier than the baseline by more than the
+# tolerance is reported as a regression and the run exits with status 1.
+# -------------
+
+import argparse
+import gc
+import json
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+import evaluate
+import numpy as np
+import pandas as pd
+from backtest import (
+    backtest,
+    gen_CCI_signal,
+    gen_MA_signal,
+    gen_MACD_signal,
+    gen_PSAR_signal,
+)
+from components import (
+    generate_backtest_plot,
+    generate_CCI_plot,
+    generate_line_chart_and_candlestick,
+    generate_MA_plot,
+    generate_MACD_plot,
+    generate_PSAR_plot,
+)
+from signalcache import signal_cache
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def synthetic_ohlcv(n_bars, seed=0, start="1800-01-01", freq=None, volatility=None):
+    """
+    Deterministic random-walk OHLCV bars.
+
+    Parameters:
+    - n_bars (int): Number of bars.
+    - seed (int): Seed of the random generator, the same seed giving the same bars.
+    - start (str): Timestamp of the first bar.
+    - freq (str): Bar frequency. Daily by default, or minutes for histories too long
+                  for pandas' date range.
+    - volatility (float): Standard deviation of the log returns, 1% a day by default
+                          and the same scaled down to a 390 minute session.
+
+    Returns:
+    - df (pd.DataFrame): Open, High, Low, Close and Volume columns on a DatetimeIndex.
+    """
+    if freq is None:
+        freq = "D" if n_bars <= 100_000 else "min"
+    if volatility is None:
+        volatility = 0.01 if freq == "D" else 0.01 / np.sqrt(390)
+    rng = np.random.default_rng(seed)
+
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, volatility, n_bars)))
+    open_ = np.empty(n_bars)
+    open_[0] = 100.0
+    open_[1:] = close[:-1] * np.exp(rng.normal(0.0, volatility / 5, n_bars - 1))
+
+    # Wicks beyond the bar's body, scaled like the close-to-close moves
+    high = np.maximum(open_, close) * np.exp(
+        np.abs(rng.normal(0.0, volatility / 2, n_bars))
+    )
+    low = np.minimum(open_, close) * np.exp(
+        -np.abs(rng.normal(0.0, volatility / 2, n_bars))
+    )
+    volume = np.round(rng.lognormal(13.0, 0.5, n_bars))
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=pd.date_range(start, periods=n_bars, freq=freq),
+    )
+
+
+def _portfolio(df):
+    signal = gen_MACD_signal(df, 12, 26, 9)
+    signal["Buy_Signal_Predict"] = signal["Buy_Signal"]
+    return backtest(signal)
+
+
+def _uncached(builder, *args):
+    # Figure builders reuse cached signals, which would hide the signal cost
+    def run(df):
+        signal_cache.clear()
+        return builder(df, *args)
+
+    return run
+
+
+# name -> (group, prepare(df) -> input of the case, run(input))
+CASES = {
+    "gen_MACD_signal": (
+        "signal",
+        None,
+        lambda df: gen_MACD_signal(df, 12, 26, 9),
+    ),
+    "gen_MA_signal": ("signal", None, lambda df: gen_MA_signal(df, 40, 100)),
+    "gen_PSAR_signal": (
+        "signal",
+        None,
+        lambda df: gen_PSAR_signal(df, 0.02, 0.2),
+    ),
+    "gen_CCI_signal": ("signal", None, lambda df: gen_CCI_signal(df, 20, 0.015)),
+    "gen_CCI_signal_mad": (
+        "signal",
+        None,
+        lambda df: gen_CCI_signal(df, 20, 0.015, deviation="mad"),
+    ),
+    "backtest": ("metric", None, lambda df: _portfolio(df)),
+    "PortfolioSimpleReturn": (
+        "metric",
+        _portfolio,
+        evaluate.PortfolioSimpleReturn,
+    ),
+    "SharpeRatio": ("metric", _portfolio, evaluate.SharpeRatio),
+    "StandardDeviation": ("metric", _portfolio, evaluate.StandardDeviation),
+    "CAGR": ("metric", _portfolio, evaluate.CAGR),
+    "MaxDrawdown": ("metric", None, evaluate.MaxDrawdown),
+    "metrics_report": (
+        "metric",
+        _portfolio,
+        lambda portfolio: evaluate.metrics_report(
+            portfolio["total"], portfolio["returns"]
+        ),
+    ),
+    "generate_line_chart_and_candlestick": (
+        "figure",
+        None,
+        generate_line_chart_and_candlestick,
+    ),
+    "generate_MACD_plot": (
+        "figure",
+        None,
+        _uncached(generate_MACD_plot, 12, 26, 9),
+    ),
+    "generate_MA_plot": ("figure", None, _uncached(generate_MA_plot, 40, 100)),
+    "generate_PSAR_plot": (
+        "figure",
+        None,
+        _uncached(generate_PSAR_plot, 0.02, 0.2),
+    ),
+    "generate_CCI_plot": (
+        "figure",
+        None,
+        _uncached(generate_CCI_plot, 20, 0.015),
+    ),
+    "generate_backtest_plot": ("figure", _portfolio, generate_backtest_plot),
+}
+
+
+def measure(run, data, repeat=3):
+    """
+    Wall time, peak memory and allocations of run(data).
+
+    The timed runs go without tracing, then one extra run is traced by tracemalloc.
+
+    Returns:
+    - result (dict): Best and median seconds over repeat runs, the peak of traced
+                     memory in bytes, and the number of memory blocks allocated and
+                     the bytes they hold when the call returns.
+    """
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        result = run(data)
+        seconds.append(time.perf_counter() - start_time)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = run(data)
+    after = tracemalloc.take_snapshot()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    diff = after.compare_to(before, "filename")
+    return {
+        "seconds": min(seconds),
+        "median_seconds": statistics.median(seconds),
+        "peak_bytes": peak_bytes,
+        "allocations": sum(max(stat.count_diff, 0) for stat in diff),
+        "allocated_bytes": sum(max(stat.size_diff, 0) for stat in diff),
+    }
+
+
+def run_benchmarks(sizes=SIZES, only=None, repeat=3, seed=0, log=print):
+    """
+    Measure every case whose name matches only at every size.
+
+    Returns:
+    - results (pd.DataFrame): One row per (case, n_bars) with the group and the
+                              measures of measure().
+    """
+    pattern = re.compile(only) if only else None
+    rows = []
+    for n_bars in sizes:
+        df = synthetic_ohlcv(n_bars, seed)
+        for name, (group, prepare, run) in CASES.items():
+            if pattern and not pattern.search(name):
+                continue
+            data = prepare(df) if prepare else df
+            row = {"case": name, "group": group, "n_bars": n_bars}
+            row.update(measure(run, data, repeat))
+            rows.append(row)
+            log(
+                f"{name:<40}{n_bars:>12,}{row['seconds']:>12.4f}s"
+                f"{row['peak_bytes'] / 1024**2:>12.1f}MB"
+            )
+        del df
+
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "case",
+            "group",
+            "n_bars",
+            "seconds",
+            "median_seconds",
+            "peak_bytes",
+            "allocations",
+            "allocated_bytes",
+        ],
+    )
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.01):
+    """
+    Compare results against a baseline of the same shape.
+
+    Parameters:
+    - results, baseline (pd.DataFrame): Outputs of run_benchmarks.
+    - tolerance (float): Allowed relative increase of time and peak memory.
+    - min_seconds (float): Times below this are too noisy to flag.
+
+    Returns:
+    - report (pd.DataFrame): The cases of both runs with their time and memory ratios
+                             and a regression flag.
+    """
+    report = results.merge(
+        baseline[["case", "n_bars", "seconds", "peak_bytes"]],
+        on=["case", "n_bars"],
+        suffixes=("", "_baseline"),
+    )
+    report["time_ratio"] = report["seconds"] / report["seconds_baseline"]
+    report["memory_ratio"] = report["peak_bytes"] / report["peak_bytes_baseline"].clip(
+        lower=1
+    )
+    slower = (report["time_ratio"] > 1 + tolerance) & (report["seconds"] > min_seconds)
+    hungrier = report["memory_ratio"] > 1 + tolerance
+    report["regression"] = slower | hungrier
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the signal functions, metrics and figure builders"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--only", help="Regular expression of the cases to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.only, args.repeat, args.seed)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results.to_dict(orient="records"), f, indent=1)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = pd.DataFrame(json.load(f))
+    report = compare(results, baseline, args.tolerance)
+    columns = ["case", "n_bars", "seconds", "time_ratio", "memory_ratio", "regression"]
+    print(report[columns].to_string(index=False))
+    regressions = report[report["regression"]]
+    if len(regressions):
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        return 1
+    print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
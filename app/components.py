@@ -1,9 +1,14 @@
 import dash_bootstrap_components as dbc
 import numpy as np
 import plotly.graph_objects as go
-from backtest import gen_CCI_signal, gen_MA_signal, gen_MACD_signal, gen_PSAR_signal
-from dash import dcc, html
+from dash import Patch, dcc, html
+from downsample import downsample_bars, downsample_line, downsample_ohlc, lttb_indices
+from evaluate import CAGR, SharpeRatio, StandardDeviation
 from plotly.subplots import make_subplots
+from signalcache import cached_signal
+
+# Point budget of every price, volume and indicator trace sent to the browser
+MAX_POINTS = 2000
 
 input_config = {
     "MACD": [
@@ -84,17 +89,21 @@ def generate_list_group_items(name_list):
     return list_group_items
 
 
-def generate_line_chart_and_candlestick(df):
+def generate_line_chart_and_candlestick(df, max_points=MAX_POINTS):
+    close_x, close_y = downsample_line(df.index, df["Close"], max_points)
+    volume_x, volume_y = downsample_bars(df.index, df["Volume"], max_points)
+    ohlc = downsample_ohlc(df, max_points)
+
     fig = make_subplots(
         rows=2, cols=1, row_heights=[0.7, 0.3], shared_xaxes=True, vertical_spacing=0.02
     )
     fig.add_trace(
-        go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close"), row=1, col=1
+        go.Scatter(x=close_x, y=close_y, mode="lines", name="Close"), row=1, col=1
     )
     fig.add_trace(
         go.Bar(
-            x=df.index,
-            y=df["Volume"],
+            x=volume_x,
+            y=volume_y,
             marker=dict(color="rgba(255, 0, 0, 0.9)"),
             name="Volume",
         ),
@@ -111,11 +120,11 @@ def generate_line_chart_and_candlestick(df):
     fig2 = go.Figure(
         data=[
             go.Candlestick(
-                x=df.index,
-                open=df["Open"],
-                high=df["High"],
-                low=df["Low"],
-                close=df["Close"],
+                x=ohlc.index,
+                open=ohlc["Open"],
+                high=ohlc["High"],
+                low=ohlc["Low"],
+                close=ohlc["Close"],
             )
         ]
     )
@@ -132,6 +141,43 @@ def generate_line_chart_and_candlestick(df):
     )
 
 
+def generate_replay_card(path, speed, interval_ms):
+    # Empty traces that the replay callbacks grow with extendData
+    fig = make_subplots(
+        rows=2, cols=1, row_heights=[0.7, 0.3], shared_xaxes=True, vertical_spacing=0.02
+    )
+    fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="Close"), row=1, col=1)
+    fig.add_trace(
+        go.Bar(x=[], y=[], marker=dict(color="rgba(255, 0, 0, 0.9)"), name="Volume"),
+        row=2,
+        col=1,
+    )
+    fig.update_layout(hovermode="x unified", uirevision="replay")
+    fig.update_yaxes(title_text="Price ($)", row=1, col=1)
+    fig.update_yaxes(title_text="Volume (unit)", row=2, col=1)
+    fig.update_traces(xaxis="x1")
+
+    fig2 = go.Figure(data=[go.Candlestick(x=[], open=[], high=[], low=[], close=[])])
+    fig2.update_layout(yaxis=dict(title="Price ($)"), uirevision="replay")
+
+    return dbc.Card(
+        [
+            html.H3("Replay", className="ms-3"),
+            html.P(f"{path} at {speed:g} bars/s", className="ms-3"),
+            html.P(id="replay-latency", className="ms-3"),
+            dcc.Graph(figure=fig, id="replay-line-graph", className="mt-3 mb-3"),
+            dcc.Graph(
+                figure=fig2, id="replay-candlestick-graph", className="mt-3 mb-3"
+            ),
+            dcc.Interval(id="replay-interval", interval=interval_ms),
+            dcc.Store(id="replay-state", data=None, storage_type="memory"),
+            dcc.Store(id="replay-clock", data=None, storage_type="memory"),
+        ],
+        body=True,
+        className="mt-3",
+    )
+
+
 def generate_strategy_and_input(strategy_list):
     return [
         dbc.Col(
@@ -207,65 +253,129 @@ def generate_backtest_accordion(strategy_list):
     )
 
 
-def generate_MACD_plot(df, a=12, b=26, c=9):
-    df_copy = df.copy()
+def _format_metric(value, spec):
+    # Metrics of too short a portfolio are NaN
+    return "-" if np.isnan(value) else format(value, spec)
+
+
+def generate_backtest_plot(portfolio, max_points=MAX_POINTS):
+    fig = go.Figure()
+    for column, name in [
+        ("total", "Total"),
+        ("cash", "Cash"),
+        ("holdings", "Holdings"),
+    ]:
+        x, y = downsample_line(portfolio.index, portfolio[column], max_points)
+        fig.add_trace(go.Scatter(x=x, y=y, mode="lines", opacity=0.8, name=name))
+
+    fig.update_yaxes(title_text="Value ($)")
+    fig.update_layout(hovermode="x unified")
+
+    metrics = [
+        ("Sharpe ratio", _format_metric(SharpeRatio(portfolio), ".2f")),
+        ("CAGR", _format_metric(CAGR(portfolio), ".2%")),
+        ("Standard deviation", _format_metric(StandardDeviation(portfolio), ".4f")),
+    ]
+    return dbc.Card(
+        [
+            dbc.Row(
+                [
+                    dbc.Col([dbc.Label(label), html.H5(value)])
+                    for label, value in metrics
+                ],
+                className="ms-2 me-2",
+            ),
+            dcc.Graph(figure=fig, className="mt-3 mb-3"),
+        ],
+        body=True,
+        className="mt-3",
+    )
+
+
+def generate_signal_marker_traces(buy_points, sell_points):
+    # Add up triangles for buy signals and sell signals at the identified points
+    return [
+        (
+            go.Scatter(
+                x=buy_points.index,
+                y=buy_points["Close"],
+                mode="markers",
+                marker=dict(symbol="triangle-up", color="green", size=10),
+                name="Buy Signal",
+            ),
+            1,
+        ),
+        (
+            go.Scatter(
+                x=sell_points.index,
+                y=sell_points["Close"],
+                mode="markers",
+                marker=dict(symbol="triangle-down", color="red", size=10),
+                name="Sell Signal",
+            ),
+            1,
+        ),
+    ]
+
+
+def patch_indicator_traces(traces):
+    """
+    Partial figure update replacing every trace after the Close price, so that the
+    price trace and the layout stay on the client.
+    """
+    patched_figure = Patch()
+    for i, (trace, row) in enumerate(traces, start=1):
+        # Same axes as make_subplots assigns, with the x axis shared
+        trace.update(xaxis="x", yaxis="y" if row == 1 else f"y{row}")
+        patched_figure["data"][i] = trace.to_plotly_json()
+    return patched_figure
+
 
-    df = gen_MACD_signal(df_copy, a, b, c)
+def generate_MACD_traces(df, a=12, b=26, c=9, max_points=MAX_POINTS):
+    # Reuse the result of an earlier view with the same data and parameters
+    df = cached_signal("MACD", df, a, b, c)
     # Identify the points where there is a change from a sell signal to a buy signal and vice versa
     buy_points = df[(df["Buy_Signal"] == True) & (df["Buy_Signal"].shift(1) == False)]
     sell_points = df[(df["Buy_Signal"] == False) & (df["Buy_Signal"].shift(1) == True)]
 
+    macd_x, macd_y = downsample_line(df.index, df["MACD"], max_points)
+    signal_x, signal_y = downsample_line(df.index, df["Signal_Line"], max_points)
+    return [
+        # MACD
+        (
+            go.Scatter(x=macd_x, y=macd_y, mode="lines", opacity=0.8, name="MACD"),
+            2,
+        ),
+        # Signal line for MACD
+        (
+            go.Scatter(
+                x=signal_x,
+                y=signal_y,
+                mode="lines",
+                opacity=0.8,
+                name="Signal Line",
+            ),
+            2,
+        ),
+    ] + generate_signal_marker_traces(buy_points, sell_points)
+
+
+def generate_MACD_plot(df, a=12, b=26, c=9, max_points=MAX_POINTS):
+    traces = generate_MACD_traces(df, a, b, c, max_points)
+
     # Create subplots
     fig = make_subplots(
         rows=2, cols=1, row_heights=[0.6, 0.4], shared_xaxes=True, vertical_spacing=0.02
     )
     # Close price
+    close_x, close_y = downsample_line(df.index, df["Close"], max_points)
     fig.add_trace(
-        go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close", opacity=0.7),
-        row=1,
-        col=1,
-    )
-    # MACD
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df["MACD"], mode="lines", opacity=0.8, name="MACD"),
-        row=2,
-        col=1,
-    )
-    # Signal line for MACD
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df["Signal_Line"],
-            mode="lines",
-            opacity=0.8,
-            name="Signal Line",
-        ),
-        row=2,
-        col=1,
-    )
-    # Add up triangles for buy signals and sell signals at the identified points
-    fig.add_trace(
-        go.Scatter(
-            x=buy_points.index,
-            y=buy_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-up", color="green", size=10),
-            name="Buy Signal",
-        ),
-        row=1,
-        col=1,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=sell_points.index,
-            y=sell_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-down", color="red", size=10),
-            name="Sell Signal",
-        ),
+        go.Scatter(x=close_x, y=close_y, mode="lines", name="Close", opacity=0.7),
         row=1,
         col=1,
     )
+    for trace, row in traces:
+        fig.add_trace(trace, row=row, col=1)
 
     # Update y-axes label
     fig.update_yaxes(title_text="Price ($)", row=1, col=1)
@@ -315,7 +425,9 @@ def generate_MACD_plot(df, a=12, b=26, c=9):
                 ],
                 className="ms-2 me-2",
             ),
-            dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3")),
+            dbc.Spinner(
+                dcc.Graph(figure=fig, id="indicator-graph", className="mt-3 mb-3")
+            ),
             dbc.Card(
                 [
                     dbc.Container(
@@ -342,68 +454,53 @@ def generate_MACD_plot(df, a=12, b=26, c=9):
     )
 
 
-def generate_MA_plot(df, short_window=40, long_window=100):
-    df_copy = df.copy()
-
-    df = gen_MA_signal(df_copy, short_window, long_window)
+def generate_MA_traces(df, short_window=40, long_window=100, max_points=MAX_POINTS):
+    df = cached_signal("MA", df, short_window, long_window)
 
     # Identify the points where there is a change from a sell signal to a buy signal and vice versa
     buy_points = df[(df["Buy_Signal"] == True) & (df["Buy_Signal"].shift(1) == False)]
     sell_points = df[(df["Buy_Signal"] == False) & (df["Buy_Signal"].shift(1) == True)]
 
+    short_x, short_y = downsample_line(df.index, df["Short_MA"], max_points)
+    long_x, long_y = downsample_line(df.index, df["Long_MA"], max_points)
+    return [
+        # Short-term MA
+        (
+            go.Scatter(
+                x=short_x,
+                y=short_y,
+                mode="lines",
+                opacity=0.8,
+                name="Short-term MA",
+            ),
+            2,
+        ),
+        # Long-term MA
+        (
+            go.Scatter(
+                x=long_x, y=long_y, mode="lines", opacity=0.8, name="Long-term MA"
+            ),
+            2,
+        ),
+    ] + generate_signal_marker_traces(buy_points, sell_points)
+
+
+def generate_MA_plot(df, short_window=40, long_window=100, max_points=MAX_POINTS):
+    traces = generate_MA_traces(df, short_window, long_window, max_points)
+
     # Create subplots
     fig = make_subplots(
         rows=2, cols=1, row_heights=[0.6, 0.4], shared_xaxes=True, vertical_spacing=0.02
     )
     # Close price
+    close_x, close_y = downsample_line(df.index, df["Close"], max_points)
     fig.add_trace(
-        go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close", opacity=0.7),
-        row=1,
-        col=1,
-    )
-    # Short-term MA
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df["Short_MA"],
-            mode="lines",
-            opacity=0.8,
-            name="Short-term MA",
-        ),
-        row=2,
-        col=1,
-    )
-    # Long-term MA
-    fig.add_trace(
-        go.Scatter(
-            x=df.index, y=df["Long_MA"], mode="lines", opacity=0.8, name="Long-term MA"
-        ),
-        row=2,
-        col=1,
-    )
-    # Add up triangles for buy signals and sell signals at the identified points
-    fig.add_trace(
-        go.Scatter(
-            x=buy_points.index,
-            y=buy_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-up", color="green", size=10),
-            name="Buy Signal",
-        ),
-        row=1,
-        col=1,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=sell_points.index,
-            y=sell_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-down", color="red", size=10),
-            name="Sell Signal",
-        ),
+        go.Scatter(x=close_x, y=close_y, mode="lines", name="Close", opacity=0.7),
         row=1,
         col=1,
     )
+    for trace, row in traces:
+        fig.add_trace(trace, row=row, col=1)
 
     # Update y-axes label
     fig.update_yaxes(title_text="Price ($)", row=1, col=1)
@@ -442,7 +539,9 @@ def generate_MA_plot(df, short_window=40, long_window=100):
                 ],
                 className="ms-2 me-2",
             ),
-            dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3")),
+            dbc.Spinner(
+                dcc.Graph(figure=fig, id="indicator-graph", className="mt-3 mb-3")
+            ),
             dbc.Card(
                 [
                     dbc.Container(
@@ -469,78 +568,65 @@ def generate_MA_plot(df, short_window=40, long_window=100):
     )
 
 
-def generate_PSAR_plot(df, initial_af=0.02, max_af=0.2):
-    df_copy = df.copy()
-
-    df = gen_PSAR_signal(df_copy, initial_af, max_af)
+def generate_PSAR_traces(df, initial_af=0.02, max_af=0.2, max_points=MAX_POINTS):
+    df = cached_signal("PSAR", df, initial_af, max_af)
 
     # Identify the points where there is a change from a sell signal to a buy signal and vice versa
     buy_points = df[(df["Buy_Signal"] == True) & (df["Buy_Signal"].shift(1) == False)]
     sell_points = df[(df["Buy_Signal"] == False) & (df["Buy_Signal"].shift(1) == True)]
 
+    # The bull and bear lines are the two halves of psar, so they share its samples
+    psar_keep = lttb_indices(df.index, df["psar"], max_points)
+    psar = df.iloc[psar_keep]
+    return [
+        # psar
+        (
+            go.Scatter(
+                x=psar.index, y=psar["psar"], mode="lines", opacity=0.8, name="PSAR"
+            ),
+            2,
+        ),
+        # psanbull
+        (
+            go.Scatter(
+                x=psar.index,
+                y=psar["psarbull"],
+                mode="lines",
+                opacity=0.8,
+                name="PSAR Bull Line",
+            ),
+            2,
+        ),
+        # psarbear
+        (
+            go.Scatter(
+                x=psar.index,
+                y=psar["psarbear"],
+                mode="lines",
+                opacity=0.8,
+                name="PSAR Bear Line",
+            ),
+            2,
+        ),
+    ] + generate_signal_marker_traces(buy_points, sell_points)
+
+
+def generate_PSAR_plot(df, initial_af=0.02, max_af=0.2, max_points=MAX_POINTS):
+    traces = generate_PSAR_traces(df, initial_af, max_af, max_points)
+
     # Create subplots
     fig = make_subplots(
         rows=2, cols=1, row_heights=[0.6, 0.4], shared_xaxes=True, vertical_spacing=0.02
     )
     # Close price
+    close_x, close_y = downsample_line(df.index, df["Close"], max_points)
     fig.add_trace(
-        go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close", opacity=0.7),
-        row=1,
-        col=1,
-    )
-    # psar
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df["psar"], mode="lines", opacity=0.8, name="PSAR"),
-        row=2,
-        col=1,
-    )
-    # psanbull
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df["psarbull"],
-            mode="lines",
-            opacity=0.8,
-            name="PSAR Bull Line",
-        ),
-        row=2,
-        col=1,
-    )
-    # psarbear
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df["psarbear"],
-            mode="lines",
-            opacity=0.8,
-            name="PSAR Bear Line",
-        ),
-        row=2,
-        col=1,
-    )
-    # Add up triangles for buy signals and sell signals at the identified points
-    fig.add_trace(
-        go.Scatter(
-            x=buy_points.index,
-            y=buy_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-up", color="green", size=10),
-            name="Buy Signal",
-        ),
-        row=1,
-        col=1,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=sell_points.index,
-            y=sell_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-down", color="red", size=10),
-            name="Sell Signal",
-        ),
+        go.Scatter(x=close_x, y=close_y, mode="lines", name="Close", opacity=0.7),
         row=1,
         col=1,
     )
+    for trace, row in traces:
+        fig.add_trace(trace, row=row, col=1)
 
     # Update y-axes label
     fig.update_yaxes(title_text="Price ($)", row=1, col=1)
@@ -579,7 +665,9 @@ def generate_PSAR_plot(df, initial_af=0.02, max_af=0.2):
                 ],
                 className="ms-2 me-2",
             ),
-            dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3")),
+            dbc.Spinner(
+                dcc.Graph(figure=fig, id="indicator-graph", className="mt-3 mb-3")
+            ),
             dbc.Card(
                 [
                     dbc.Container(
@@ -606,78 +694,63 @@ def generate_PSAR_plot(df, initial_af=0.02, max_af=0.2):
     )
 
 
-def generate_CCI_plot(df, window_size=20, constant=0.015):
-    df_copy = df.copy()
-
-    df = gen_CCI_signal(df_copy, window_size, constant)
+def generate_CCI_traces(df, window_size=20, constant=0.015, max_points=MAX_POINTS):
+    df = cached_signal("CCI", df, window_size, constant)
 
     # Identify the points where there is a change from a sell signal to a buy signal and vice versa
     buy_points = df[(df["CCI"] >= 100) & (df["CCI"].shift(1) < 100)]
     sell_points = df[(df["CCI"] < 100) & (df["CCI"].shift(1) >= 100)]
 
+    cci_x, cci_y = downsample_line(df.index, df["CCI"], max_points)
+    # Constant levels only need their two end points
+    level_x = df.index[[0, -1]] if len(df.index) else df.index
+    return [
+        # CCI
+        (
+            go.Scatter(x=cci_x, y=cci_y, mode="lines", opacity=0.8, name="CCI"),
+            2,
+        ),
+        # CCI=100
+        (
+            go.Scatter(
+                x=level_x,
+                y=np.repeat(100, len(level_x)),
+                mode="lines",
+                opacity=0.8,
+                name="CCI=100",
+            ),
+            2,
+        ),
+        # CCI=-100
+        (
+            go.Scatter(
+                x=level_x,
+                y=np.repeat(-100, len(level_x)),
+                mode="lines",
+                opacity=0.8,
+                name="CCI=-100",
+            ),
+            2,
+        ),
+    ] + generate_signal_marker_traces(buy_points, sell_points)
+
+
+def generate_CCI_plot(df, window_size=20, constant=0.015, max_points=MAX_POINTS):
+    traces = generate_CCI_traces(df, window_size, constant, max_points)
+
     # Create subplots
     fig = make_subplots(
         rows=2, cols=1, row_heights=[0.6, 0.4], shared_xaxes=True, vertical_spacing=0.02
     )
     # Close price
+    close_x, close_y = downsample_line(df.index, df["Close"], max_points)
     fig.add_trace(
-        go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close", opacity=0.7),
-        row=1,
-        col=1,
-    )
-    # psar
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df["CCI"], mode="lines", opacity=0.8, name="CCI"),
-        row=2,
-        col=1,
-    )
-    # psanbull
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=np.repeat(100, len(df.index)),
-            mode="lines",
-            opacity=0.8,
-            name="CCI=100",
-        ),
-        row=2,
-        col=1,
-    )
-    # psarbear
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=np.repeat(-100, len(df.index)),
-            mode="lines",
-            opacity=0.8,
-            name="CCI=-100",
-        ),
-        row=2,
-        col=1,
-    )
-    # Add up triangles for buy signals and sell signals at the identified points
-    fig.add_trace(
-        go.Scatter(
-            x=buy_points.index,
-            y=buy_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-up", color="green", size=10),
-            name="Buy Signal",
-        ),
-        row=1,
-        col=1,
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=sell_points.index,
-            y=sell_points["Close"],
-            mode="markers",
-            marker=dict(symbol="triangle-down", color="red", size=10),
-            name="Sell Signal",
-        ),
+        go.Scatter(x=close_x, y=close_y, mode="lines", name="Close", opacity=0.7),
         row=1,
         col=1,
     )
+    for trace, row in traces:
+        fig.add_trace(trace, row=row, col=1)
 
     # Update y-axes label
     fig.update_yaxes(title_text="Price ($)", row=1, col=1)
@@ -716,7 +789,9 @@ def generate_CCI_plot(df, window_size=20, constant=0.015):
                 ],
                 className="ms-2 me-2",
             ),
-            dbc.Spinner(dcc.Graph(figure=fig, className="mt-3 mb-3")),
+            dbc.Spinner(
+                dcc.Graph(figure=fig, id="indicator-graph", className="mt-3 mb-3")
+            ),
             dbc.Card(
                 [
                     dbc.Container(
@@ -1,8 +1,100 @@
-import datetime as dt
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 import yfinance as yf
+from store import OHLCVStore
+
+
+def download_ohlcv(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Function that downloads the daily OHLCV bars of one ticker from Yahoo Finance.
+
+    Parameters:
+    - ticker (str): Stock Ticker.
+    - start_date, end_date (str): Start and (exclusive) end dates in the format 'YYYY-MM-DD'.
+
+    Returns:
+    - df (pd.DataFrame): A DataFrame with dates as indexes and one column per field.
+    """
+    df = yf.download(ticker, start_date, end_date)
+    df.columns = df.columns.get_level_values(0)
+    return df
+
+
+# Local columnar copy of every ticker downloaded so far
+ohlcv_store = OHLCVStore(download_ohlcv)
+
+
+def download_many(
+    tickers: list,
+    start_date: str,
+    end_date: str,
+    field="Adj Close",
+    provider=None,
+    max_workers: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> pd.DataFrame:
+    """
+    Function that downloads many tickers concurrently and assembles one column per
+    ticker into a single frame aligned on the union of their dates.
+
+    Parameters:
+    - tickers (list): List of Stock Tickers.
+    - start_date, end_date (str): Start and end dates in the format 'YYYY-MM-DD'.
+    - field (str or callable): Column to keep, or a function mapping each ticker's
+                               DataFrame to a Series.
+    - provider (callable): provider(ticker, start_date, end_date) -> pd.DataFrame.
+                           Defaults to the local OHLCV store.
+    - max_workers (int): Maximum number of concurrent downloads.
+    - retries (int): Retries per ticker before giving up.
+    - backoff (float): Seconds to wait before the first retry, doubled after each one.
+
+    Returns:
+    - df (pd.DataFrame): A DataFrame with dates as indexes and one column per ticker,
+                         NaN where a ticker has no bar on a date.
+    """
+    if provider is None:
+        provider = ohlcv_store.get
+    select = field if callable(field) else (lambda frame: frame[field])
+
+    def load(ticker):
+        for attempt in range(retries + 1):
+            try:
+                return select(provider(ticker, start_date, end_date))
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(backoff * 2**attempt)
+
+    series, failed = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(load, ticker): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            try:
+                series[futures[future]] = future.result()
+            except Exception:
+                failed.append(futures[future])
+    if failed:
+        raise RuntimeError(f"Failed to download: {', '.join(sorted(failed))}")
+    if not series:
+        return pd.DataFrame(columns=list(tickers), dtype=np.float64)
+
+    # Fill a single preallocated block instead of growing the frame column by column
+    index = (
+        pd.DatetimeIndex(np.concatenate([s.index.to_numpy() for s in series.values()]))
+        .unique()
+        .sort_values()
+    )
+    index.name = next(iter(series.values())).index.name
+    values = np.full((len(index), len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        s = series[ticker]
+        values[index.get_indexer(s.index), j] = s.to_numpy(dtype=np.float64)
+
+    return pd.DataFrame(values, index=index, columns=list(tickers))
 
 
 def get_returns_for_multiple_stocks(
@@ -22,21 +114,14 @@ def get_returns_for_multiple_stocks(
                                  to the log returns series of each ticker.
     """
 
-    # initialise output dataframe
-    returns_df = pd.DataFrame()
-
-    for ticker in tickers:
-        # retrieve stock data (includes Date, OHLC, Volume, Adjusted Close)
-        format = "%Y-%m-%d"
-        s = yf.download(
-            ticker,
-            dt.datetime.strptime(start_date, format),
-            dt.datetime.strptime(end_date, format),
-        )
-        # calculate log returns
-        s["Log Returns"] = np.log(s["Adj Close"] / s["Adj Close"].shift(1))
-        # append to returns_df
-        returns_df[ticker] = s["Log Returns"]
+    # retrieve stock data (includes Date, OHLC, Volume, Adjusted Close)
+    # and calculate the log returns of each ticker on its own dates
+    returns_df = download_many(
+        tickers,
+        start_date,
+        end_date,
+        field=lambda s: np.log(s["Adj Close"] / s["Adj Close"].shift(1)),
+    )
 
     # skip the first row (that will be NA)
     # and fill other NA values by 0 in case there are trading halts on specific days
@@ -61,18 +146,7 @@ def get_close_for_multiple_stocks(tickers, start_date, end_date):
                                  to the log returns series of each ticker.
     """
 
-    # initialise output dataframe
-    close_df = pd.DataFrame()
-
-    for ticker in tickers:
-        # retrieve stock data (includes Date, OHLC, Volume, Adjusted Close)
-        format = "%Y-%m-%d"
-        s = yf.download(
-            ticker,
-            dt.datetime.strptime(start_date, format),
-            dt.datetime.strptime(end_date, format),
-        )
-        # append to returns_df
-        close_df[ticker] = s["Adj Close"]
+    # retrieve stock data (includes Date, OHLC, Volume, Adjusted Close)
+    close_df = download_many(tickers, start_date, end_date, field="Adj Close")
 
     return close_df.dropna()
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+
+def _x_values(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    return np.asarray(index, dtype=np.float64)
+
+
+def _fill_gaps(y):
+    # Forward then backward fill NaNs so they do not poison the triangle areas
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if valid.all() or not valid.any():
+        return np.nan_to_num(y)
+    pos = np.where(valid, np.arange(len(y)), 0)
+    np.maximum.accumulate(pos, out=pos)
+    pos[: np.argmax(valid)] = np.argmax(valid)
+    return y[pos]
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line.
+
+    Parameters:
+    - x (array-like or pd.Index): x values, datetimes included.
+    - y (array-like): y values, NaNs allowed.
+    - max_points (int): Number of points to keep.
+
+    Returns:
+    - indices (np.ndarray): Sorted positions of the points to keep, always including
+                            the first and the last one.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = _x_values(x)
+    y = _fill_gaps(y)
+
+    every = (n - 2) / (max_points - 2)
+    edges = np.append((np.arange(max_points - 1) * every).astype(np.int64) + 1, n)
+    edges[-2] = n - 1
+
+    # Average point of every bucket, the last bucket being the final point alone
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / counts
+    avg_y = np.add.reduceat(y, edges[:-1]) / counts
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    indices[-1] = n - 1
+
+    return indices
+
+
+def minmax_indices(y, max_points):
+    """
+    Keep the minimum and the maximum of each of max_points // 2 equal buckets.
+
+    Returns:
+    - indices (np.ndarray): Sorted positions of the points to keep.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    # Sorting by (bucket, value) puts each bucket's min first and max last
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+def downsample_line(index, y, max_points):
+    """
+    LTTB-downsample a line trace and return its (x, y) values.
+    """
+    keep = lttb_indices(index, y, max_points)
+    return index[keep], np.asarray(y)[keep]
+
+
+def downsample_bars(index, y, max_points):
+    """
+    Min/max-downsample a bar trace and return its (x, y) values.
+    """
+    keep = minmax_indices(y, max_points)
+    return index[keep], np.asarray(y)[keep]
+
+
+def downsample_ohlc(df, max_points):
+    """
+    Re-aggregate consecutive OHLC bars so that at most max_points candles remain.
+
+    Each candle opens with the first bar, closes with the last and spans the highest
+    high and lowest low of the bars it replaces. It is placed at its first bar.
+    """
+    n = len(df)
+    if max_points >= n or max_points < 1:
+        return df[["Open", "High", "Low", "Close"]]
+
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n) - 1
+
+    return pd.DataFrame(
+        {
+            "Open": df["Open"].to_numpy()[starts],
+            "High": np.maximum.reduceat(df["High"].to_numpy(), starts),
+            "Low": np.minimum.reduceat(df["Low"].to_numpy(), starts),
+            "Close": df["Close"].to_numpy()[ends],
+        },
+        index=df.index[starts],
+    )
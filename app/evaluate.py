@@ -5,6 +5,7 @@
 import math
 
 import numpy as np
+import pandas as pd
 
 """
 Portfolio return
@@ -64,11 +65,18 @@ Formula
 
 
 def CAGR(portfolio):
+    if len(portfolio) < 2:
+        return np.nan
+
     # Get the number of days in df
     days = (portfolio.index[-1] - portfolio.index[0]).days
+    if days == 0:
+        return np.nan
 
     # Calculate the CAGR
-    cagr = (((portfolio["total"][-1] / portfolio["total"][0])) ** (252.0 / days)) - 1
+    cagr = (
+        ((portfolio["total"].iloc[-1] / portfolio["total"].iloc[0])) ** (252.0 / days)
+    ) - 1
 
     return cagr
 
@@ -85,6 +93,8 @@ sqrt(sum[(r_i - r_avg)^2] / n-1)
 def StandardDeviation(portfolio):
     # Isolate the returns of your strategy
     returns = portfolio["returns"]
+    if len(returns) < 2:
+        return np.nan
 
     returns_diff = returns - returns.mean()
     returns_diff = returns_diff * returns_diff
@@ -94,3 +104,148 @@ def StandardDeviation(portfolio):
     sd = math.sqrt(returns_diff_sum / (len(returns) - 1))
 
     return sd
+
+
+"""
+Metrics report
+
+All the metrics above for many portfolios at once
+"""
+
+
+def metrics_report(
+    total, returns=None, index=None, chunk_size=8192, block_size=1 << 17
+):
+    """
+    Score many portfolios in a single pass over their bars, vectorized across the
+    portfolios and blocks of bars.
+
+    Parameters:
+    - total (pd.DataFrame or np.ndarray): Portfolio values with one row per bar and one
+                                          column per portfolio. Leading NaNs mark bars
+                                          before a portfolio starts.
+    - returns (pd.DataFrame or np.ndarray): Matching returns, the percentage change of
+                                            total by default.
+    - index (pd.DatetimeIndex): Bar dates for CAGR, total's index by default. Without
+                                dates, bars are counted as days.
+    - chunk_size (int): Number of portfolios scored together.
+    - block_size (int): Number of values per block of bars, bounding the memory of
+                        the temporaries.
+
+    Returns:
+    - report (pd.DataFrame): One row per portfolio with simple_return, sharpe_ratio,
+                             standard_deviation, cagr and max_drawdown as computed by
+                             PortfolioSimpleReturn, SharpeRatio, StandardDeviation, CAGR
+                             and the all-time maximum drawdown of total.
+    """
+    columns = total.columns if isinstance(total, pd.DataFrame) else None
+    if index is None and isinstance(total, (pd.DataFrame, pd.Series)):
+        index = total.index
+    total = np.asarray(total, dtype=np.float64)
+    if total.ndim == 1:
+        total = total[:, None]
+    if returns is not None:
+        returns = np.asarray(returns, dtype=np.float64).reshape(total.shape)
+
+    n_bars, n_portfolios = total.shape
+    if index is not None:
+        days_since = (pd.DatetimeIndex(index)[-1] - pd.DatetimeIndex(index)).days
+        days_since = np.asarray(days_since, dtype=np.float64)
+    else:
+        days_since = np.arange(n_bars - 1, -1, -1, dtype=np.float64)
+
+    report = np.empty((n_portfolios, 5))
+    for lo in range(0, n_portfolios, chunk_size):
+        hi = min(lo + chunk_size, n_portfolios)
+        tot = total[:, lo:hi]
+        ret = returns[:, lo:hi] if returns is not None else None
+        width = hi - lo
+
+        n_live = np.zeros(width)
+        n_returns = np.zeros(width)
+        mean = np.zeros(width)
+        squares = np.zeros(width)
+        peak = np.full(width, np.nan)
+        trough = np.full(width, np.nan)
+        block = max(block_size // width, 1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Advance every portfolio a block of bars at a time: running moments of
+            # the returns, merged block by block (Chan et al.) with NaNs skipped as
+            # pandas does, and the running maximum of total
+            for start in range(0, n_bars, block):
+                rows = tot[start : start + block]
+                if ret is None:
+                    step = np.full_like(rows, np.nan)
+                    skip = 1 if start == 0 else 0
+                    np.divide(
+                        rows[skip:],
+                        tot[start + skip - 1 : start + len(rows) - 1],
+                        out=step[skip:],
+                    )
+                    step -= 1.0
+                else:
+                    step = ret[start : start + block]
+
+                valid = step == step
+                count = valid.sum(axis=0)
+                block_mean = np.where(valid, step, 0.0).sum(axis=0) / np.maximum(
+                    count, 1
+                )
+                deviation = np.where(valid, step - block_mean, 0.0)
+                block_squares = (deviation * deviation).sum(axis=0)
+
+                merged = n_returns + count
+                delta = block_mean - mean
+                weight = count / np.maximum(merged, 1)
+                mean += delta * weight
+                squares += block_squares + delta * delta * n_returns * weight
+                n_returns = merged
+
+                n_live += (rows == rows).sum(axis=0)
+                if width >= 256:
+                    # Accumulating down the columns of wide rows is slower than
+                    # stepping through the rows
+                    running = np.empty_like(rows)
+                    np.fmax(peak, rows[0], out=running[0])
+                    for i in range(1, len(rows)):
+                        np.fmax(running[i - 1], rows[i], out=running[i])
+                else:
+                    running = np.fmax.accumulate(rows, axis=0)
+                    np.fmax(running, peak, out=running)
+                np.fmin(trough, np.fmin.reduce(rows / running, axis=0), out=trough)
+                peak = running[-1]
+
+            # Like pandas, the std of fewer than two returns is NaN
+            std = np.where(n_returns >= 2, np.sqrt(squares / (n_returns - 1)), np.nan)
+            sharpe_ratio = np.where(std != 0, np.sqrt(252) * mean / std, 0)
+            # StandardDeviation divides by the number of live bars minus one
+            standard_deviation = np.where(
+                n_live >= 2, np.sqrt(squares / (n_live - 1)), np.nan
+            )
+
+            first = np.minimum(n_bars - n_live, n_bars - 1).astype(np.intp)
+            days = days_since[first]
+            cagr = np.where(
+                (n_live >= 2) & (days != 0),
+                (tot[-1] / tot[first, np.arange(width)]) ** (252.0 / days) - 1,
+                np.nan,
+            )
+            mean = np.where(n_returns > 0, mean, np.nan)
+            max_drawdown = trough - 1.0
+
+        report[lo:hi] = np.column_stack(
+            [mean, sharpe_ratio, standard_deviation, cagr, max_drawdown]
+        )
+
+    return pd.DataFrame(
+        report,
+        index=columns,
+        columns=[
+            "simple_return",
+            "sharpe_ratio",
+            "standard_deviation",
+            "cagr",
+            "max_drawdown",
+        ],
+    )
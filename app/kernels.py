@@ -0,0 +1,490 @@
+import numpy as np
+
+# Below this many rows, looping the scalar kernel per row beats stepping the whole
+# batch per bar, whose NumPy calls cost about the same however few the rows
+PSAR_BATCH_MIN_ROWS = 64
+
+
+def _as_batch(high, low, close, initial_af, max_af):
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    initial_af = np.atleast_1d(np.asarray(initial_af, dtype=np.float64))
+    max_af = np.atleast_1d(np.asarray(max_af, dtype=np.float64))
+    if initial_af.shape != max_af.shape or initial_af.ndim != 1:
+        raise ValueError(
+            "initial_af and max_af must be scalars or 1D arrays of equal length"
+        )
+
+    series_shape = high.shape[:-1]
+    n_pairs = len(initial_af)
+    n_bars = high.shape[-1]
+
+    n_series = int(np.prod(series_shape, dtype=np.int64))
+
+    # Every (series, parameter pair) combination becomes one row of the batch
+    def rows(arr):
+        arr = arr.reshape(n_series, 1, n_bars)
+        return np.broadcast_to(arr, (n_series, n_pairs, n_bars)).reshape(
+            n_series * n_pairs, n_bars
+        )
+
+    af_rows = np.tile(initial_af, n_series)
+    max_rows = np.tile(max_af, n_series)
+
+    return rows(high), rows(low), rows(close), af_rows, max_rows, series_shape
+
+
+def _psar_loop(array_high, array_low, array_close, initial_af, max_af, block=1 << 16):
+    # Scalar state machine for one series, stepping plain floats where per-bar NumPy
+    # calls would cost more. The bars are read a block at a time into lists, the
+    # fastest to index from Python, and the results written back into preallocated
+    # arrays, so the memory of the lists stays bounded by the block size
+    length = len(array_close)
+    psar = np.array(array_close, dtype=np.float64)
+    bull_flags = np.zeros(length, dtype=bool)
+    if length < 3:
+        return psar, bull_flags
+
+    bull = True
+    af = initial_af
+    hp = float(array_high[0])
+    lp = float(array_low[0])
+    prev = float(psar[1])
+
+    for lo in range(2, length, block):
+        hi = min(lo + block, length)
+        # Two bars of overlap for the lookback of the clamp
+        highs = array_high[lo - 2 : hi].tolist()
+        lows = array_low[lo - 2 : hi].tolist()
+        values = [0.0] * (hi - lo)
+        flags = [False] * (hi - lo)
+
+        for j in range(hi - lo):
+            k = j + 2
+            if bull:
+                curr = prev + af * (hp - prev)
+            else:
+                curr = prev + af * (lp - prev)
+
+            reverse = False
+
+            if bull:
+                if lows[k] < curr:
+                    bull = False
+                    reverse = True
+                    curr = hp
+                    lp = lows[k]
+                    af = initial_af
+            else:
+                if highs[k] > curr:
+                    bull = True
+                    reverse = True
+                    curr = lp
+                    hp = highs[k]
+                    af = initial_af
+
+            if not reverse:
+                if bull:
+                    if highs[k] > hp:
+                        hp = highs[k]
+                        af = min(af + initial_af, max_af)
+                    if lows[k - 1] < curr:
+                        curr = lows[k - 1]
+                    if lows[k - 2] < curr:
+                        curr = lows[k - 2]
+                else:
+                    if lows[k] < lp:
+                        lp = lows[k]
+                        af = min(af + initial_af, max_af)
+                    if highs[k - 1] > curr:
+                        curr = highs[k - 1]
+                    if highs[k - 2] > curr:
+                        curr = highs[k - 2]
+
+            values[j] = curr
+            flags[j] = bull
+            prev = curr
+
+        psar[lo:hi] = values
+        bull_flags[lo:hi] = flags
+
+    return psar, bull_flags
+
+
+def _psar_vectorized(high, low, close, initial_af, max_af):
+    # Same state machine as _psar_loop, stepping every row of the batch per bar
+    n_rows, length = close.shape
+    psar = close.copy()
+    bull_flags = np.zeros((n_rows, length), dtype=bool)
+
+    bull = np.ones(n_rows, dtype=bool)
+    af = initial_af.copy()
+    if length > 0:
+        hp = high[:, 0].copy()
+        lp = low[:, 0].copy()
+
+    for i in range(2, length):
+        prev = psar[:, i - 1]
+        high_i = high[:, i]
+        low_i = low[:, i]
+
+        curr = np.where(bull, prev + af * (hp - prev), prev + af * (lp - prev))
+
+        # Check reversion point
+        to_bear = bull & (low_i < curr)
+        to_bull = ~bull & (high_i > curr)
+        curr = np.where(to_bear, hp, curr)
+        curr = np.where(to_bull, lp, curr)
+        lp = np.where(to_bear, low_i, lp)
+        hp = np.where(to_bull, high_i, hp)
+        reverse = to_bear | to_bull
+        bull = bull ^ reverse
+        af = np.where(reverse, initial_af, af)
+
+        # Extend the trend and clamp SAR to the prior two periods
+        stay_bull = ~reverse & bull
+        stay_bear = ~reverse & ~bull
+
+        new_high = stay_bull & (high_i > hp)
+        new_low = stay_bear & (low_i < lp)
+        hp = np.where(new_high, high_i, hp)
+        lp = np.where(new_low, low_i, lp)
+        af = np.where(new_high | new_low, np.minimum(af + initial_af, max_af), af)
+
+        curr = np.where(stay_bull & (low[:, i - 1] < curr), low[:, i - 1], curr)
+        curr = np.where(stay_bull & (low[:, i - 2] < curr), low[:, i - 2], curr)
+        curr = np.where(stay_bear & (high[:, i - 1] > curr), high[:, i - 1], curr)
+        curr = np.where(stay_bear & (high[:, i - 2] > curr), high[:, i - 2], curr)
+
+        psar[:, i] = curr
+        bull_flags[:, i] = bull
+
+    return psar, bull_flags
+
+
+def psar(high, low, close, initial_af=0.02, max_af=0.2):
+    """
+    Parabolic SAR over contiguous NumPy arrays.
+
+    Parameters:
+    - high, low, close (np.ndarray): Arrays of shape (n_bars,) or (n_series, n_bars).
+    - initial_af, max_af (float or np.ndarray): Acceleration factors, either scalars
+                                                or 1D arrays holding one pair per entry.
+
+    Returns:
+    - psar, psarbull, psarbear (np.ndarray): float64 arrays of shape
+                                             series_shape + (n_pairs,) + (n_bars,), with the
+                                             pair axis dropped when scalar factors are given.
+                                             psarbull / psarbear are NaN outside their trend.
+    """
+    scalar_params = np.ndim(initial_af) == 0 and np.ndim(max_af) == 0
+    high, low, close, af_rows, max_rows, series_shape = _as_batch(
+        high, low, close, initial_af, max_af
+    )
+
+    if close.shape[0] < PSAR_BATCH_MIN_ROWS:
+        values = np.empty(close.shape)
+        bull_flags = np.empty(close.shape, dtype=bool)
+        for row in range(close.shape[0]):
+            values[row], bull_flags[row] = _psar_loop(
+                high[row],
+                low[row],
+                close[row],
+                float(af_rows[row]),
+                float(max_rows[row]),
+            )
+    else:
+        values, bull_flags = _psar_vectorized(high, low, close, af_rows, max_rows)
+
+    # The first two bars seed the SAR and belong to neither trend
+    bear_flags = ~bull_flags
+    bear_flags[:, :2] = False
+
+    psarbull = np.where(bull_flags, values, np.nan)
+    psarbear = np.where(bear_flags, values, np.nan)
+
+    out_shape = series_shape + (
+        () if scalar_params else (len(np.atleast_1d(initial_af)),)
+    )
+    out_shape = out_shape + (close.shape[-1],)
+    return (
+        values.reshape(out_shape),
+        psarbull.reshape(out_shape),
+        psarbear.reshape(out_shape),
+    )
+
+
+def rolling_mean(x, windows):
+    """
+    Trailing rolling means with min_periods=1 for several window lengths at once,
+    all read off a single prefix-sum array.
+
+    Parameters:
+    - x (np.ndarray): Array of shape (n_bars,) or (n_series, n_bars). NaNs are skipped
+                      like in pandas, and windows without any observation give NaN.
+    - windows (int or list): One or more window lengths.
+
+    Returns:
+    - means (np.ndarray): float64 array of shape x.shape[:-1] + (n_windows,) + (n_bars,).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    if windows.ndim != 1 or (windows < 1).any():
+        raise ValueError("windows must be positive integers")
+
+    n_bars = x.shape[-1]
+    valid = ~np.isnan(x)
+
+    # Centre each series before accumulating to limit cancellation in long sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        offset = np.where(valid, x, 0.0).sum(axis=-1) / valid.sum(axis=-1)
+    offset = np.nan_to_num(offset, nan=0.0)[..., None]
+
+    csum = np.zeros(x.shape[:-1] + (n_bars + 1,))
+    np.cumsum(np.where(valid, x - offset, 0.0), axis=-1, out=csum[..., 1:])
+    ccount = np.zeros(x.shape[:-1] + (n_bars + 1,), dtype=np.int64)
+    np.cumsum(valid, axis=-1, out=ccount[..., 1:])
+
+    end = np.arange(1, n_bars + 1)
+    start = np.maximum(end[None, :] - windows[:, None], 0)
+
+    sums = csum[..., end][..., None, :] - csum[..., start]
+    counts = ccount[..., end][..., None, :] - ccount[..., start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+
+    return means + offset[..., None, :]
+
+
+def rolling_mean_deviation(x, windows, means=None, block_size=1 << 22):
+    """
+    Trailing rolling mean absolute deviations with min_periods=1 for several window
+    lengths at once: the mean of |x[j] - mean[t]| over the window ending at t, as
+    used by the textbook CCI.
+
+    The deviations of each window are taken in blocks of bars over a strided view
+    of the series, so no Python-level loop runs per bar or per window position.
+
+    Parameters:
+    - x (np.ndarray): Array of shape (n_bars,) or (n_series, n_bars). NaNs are skipped.
+    - windows (int or list): One or more window lengths.
+    - means (np.ndarray): The matching rolling_mean(x, windows), if already at hand.
+    - block_size (int): Number of deviations held in memory at a time.
+
+    Returns:
+    - deviations (np.ndarray): float64 array of shape
+                               x.shape[:-1] + (n_windows,) + (n_bars,).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    if means is None:
+        means = rolling_mean(x, windows)
+
+    n_bars = x.shape[-1]
+    n_series = int(np.prod(x.shape[:-1], dtype=np.int64))
+    out = np.empty(means.shape)
+
+    for k, window in enumerate(windows):
+        window = int(max(min(window, n_bars), 1))
+        padded = np.full(x.shape[:-1] + (n_bars + window - 1,), np.nan)
+        padded[..., window - 1 :] = x
+        view = np.lib.stride_tricks.sliding_window_view(padded, window, axis=-1)
+
+        step = max(block_size // (window * max(n_series, 1)), 1)
+        for lo in range(0, n_bars, step):
+            hi = min(lo + step, n_bars)
+            deviation = np.abs(view[..., lo:hi, :] - means[..., k, lo:hi, None])
+            count = (deviation == deviation).sum(axis=-1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[..., k, lo:hi] = np.where(
+                    count > 0, np.nansum(deviation, axis=-1) / count, np.nan
+                )
+
+    return out
+
+
+def _rolling_extreme(x, windows, ufunc):
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    if windows.ndim != 1 or (windows < 1).any():
+        raise ValueError("windows must be positive integers")
+
+    n_bars = x.shape[-1]
+    out = np.empty(x.shape[:-1] + (len(windows), n_bars))
+    if n_bars == 0:
+        return out
+
+    for k, window in enumerate(windows):
+        # van Herk/Gil-Werman: cut the series into blocks of one window and take
+        # running extremes forwards and backwards within each block. Any window
+        # then spans at most two blocks, the tail of one and the head of the next.
+        window = int(min(window, n_bars))
+        n_blocks = -(-(n_bars + window - 1) // window)
+        padded = np.full(x.shape[:-1] + (n_blocks * window,), np.nan)
+        padded[..., window - 1 : window - 1 + n_bars] = x
+        blocks = padded.reshape(x.shape[:-1] + (n_blocks, window))
+
+        head = ufunc.accumulate(blocks, axis=-1).reshape(padded.shape)
+        tail = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(
+            padded.shape
+        )
+        out[..., k, :] = ufunc(
+            tail[..., :n_bars], head[..., window - 1 : window - 1 + n_bars]
+        )
+
+    return out
+
+
+def rolling_max(x, windows):
+    """
+    Trailing rolling maxima with min_periods=1 for several window lengths at once,
+    in O(n_bars) per series and window.
+
+    Parameters:
+    - x (np.ndarray): Array of shape (n_bars,) or (n_series, n_bars). NaNs are skipped
+                      like in pandas, and windows without any observation give NaN.
+    - windows (int or list): One or more window lengths.
+
+    Returns:
+    - maxima (np.ndarray): float64 array of shape x.shape[:-1] + (n_windows,) + (n_bars,),
+                           equal to x.rolling(window, min_periods=1).max() per window.
+    """
+    return _rolling_extreme(x, windows, np.fmax)
+
+
+def rolling_min(x, windows):
+    """
+    Trailing rolling minima with min_periods=1, the counterpart of rolling_max.
+    """
+    return _rolling_extreme(x, windows, np.fmin)
+
+
+def rolling_max_drawdown(x, windows):
+    """
+    evaluate.MaxDrawdown for several series and window lengths at once.
+
+    Parameters:
+    - x (np.ndarray): Prices of shape (n_bars,) or (n_series, n_bars).
+    - windows (int or list): One or more window lengths.
+
+    Returns:
+    - max_drawdown (np.ndarray): Lowest drawdown of the trailing window, of shape
+                                 x.shape[:-1] + (n_windows,) + (n_bars,).
+    - drawdown (np.ndarray): Drawdown from the trailing window's maximum, same shape.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = x[..., None, :] / rolling_max(x, windows) - 1.0
+
+    max_drawdown = np.empty_like(drawdown)
+    for k, window in enumerate(windows):
+        max_drawdown[..., k, :] = rolling_min(drawdown[..., k, :], window)[..., 0, :]
+
+    return max_drawdown, drawdown
+
+
+def ewm_mean_rows(rows, spans):
+    """
+    Exponential moving averages (adjust=False) where each row has its own span.
+
+    Parameters:
+    - rows (np.ndarray): float64 array of shape (n_rows, n_bars).
+    - spans (np.ndarray): Array of shape (n_rows,).
+
+    Returns:
+    - means (np.ndarray): float64 array of shape (n_rows, n_bars).
+    """
+    # One recursive pass over the bars, advancing every row at once.
+    # Mirrors pandas' ewm(adjust=False, ignore_na=False).mean() step for step.
+    n_rows, n_bars = rows.shape
+    com = (spans - 1) / 2.0
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+
+    out = np.empty((n_rows, n_bars))
+    if n_bars == 0:
+        return out
+
+    weighted = rows[:, 0].copy()
+    old_wt = np.ones(n_rows)
+    out[:, 0] = weighted
+
+    for i in range(1, n_bars):
+        cur = rows[:, i]
+        is_observation = cur == cur
+        has_weighted = weighted == weighted
+
+        old_wt = np.where(has_weighted, old_wt * old_wt_factor, old_wt)
+        update = has_weighted & is_observation
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+        weighted = np.where(update & (weighted != cur), blended, weighted)
+        old_wt = np.where(update, 1.0, old_wt)
+        weighted = np.where(~has_weighted & is_observation, cur, weighted)
+
+        out[:, i] = weighted
+
+    return out
+
+
+def ewm_mean(x, spans):
+    """
+    Exponential moving averages (adjust=False) for several spans in one pass.
+
+    Parameters:
+    - x (np.ndarray): Array of shape (n_bars,) or (n_series, n_bars).
+    - spans (float or list): One or more spans.
+
+    Returns:
+    - means (np.ndarray): float64 array of shape x.shape[:-1] + (n_spans,) + (n_bars,),
+                          equal to x.ewm(span=span, adjust=False).mean() per span.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    spans = np.atleast_1d(np.asarray(spans, dtype=np.float64))
+    if spans.ndim != 1 or (spans < 1).any():
+        raise ValueError("spans must be numbers greater than or equal to 1")
+
+    n_bars = x.shape[-1]
+    rows = x.reshape(-1, 1, n_bars)
+    rows = np.broadcast_to(rows, (rows.shape[0], len(spans), n_bars))
+    row_spans = np.broadcast_to(spans, rows.shape[:2])
+
+    out = ewm_mean_rows(
+        rows.reshape(-1, n_bars), np.ascontiguousarray(row_spans).reshape(-1)
+    )
+    return out.reshape(x.shape[:-1] + (len(spans), n_bars))
+
+
+def simulate_portfolio(signal, close, initial_capital=100000.0, shares=100):
+    """
+    Long-only portfolio holding a fixed number of shares whenever the signal is on.
+
+    Parameters:
+    - signal (np.ndarray): Buy signals (bool or 0/1) of shape (..., n_bars).
+    - close (np.ndarray): Prices broadcastable against signal.
+    - initial_capital (float): Starting cash.
+    - shares (int): Number of shares held while the signal is on.
+
+    Returns:
+    - positions, holdings, cash, total, returns (np.ndarray): float64 arrays with the
+                                                             broadcast shape. returns
+                                                             is NaN on the first bar.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    positions = shares * signal
+    trades = np.diff(positions, axis=-1, prepend=0.0)
+    cash = initial_capital - np.cumsum(trades * close, axis=-1)
+    holdings = positions * close
+    total = cash + holdings
+
+    returns = np.empty_like(total)
+    returns[..., :1] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(total[..., 1:], total[..., :-1], out=returns[..., 1:])
+    returns[..., 1:] -= 1.0
+
+    return positions, holdings, cash, total, returns
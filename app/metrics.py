@@ -0,0 +1,262 @@
+import bisect
+import functools
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets, +Inf is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram of durations, with the quantiles of the most recent
+    observations on the side.
+
+    Parameters:
+    - buckets (tuple): Upper bounds of the buckets in seconds.
+    - window (int): Number of recent observations the quantiles are taken over.
+    """
+
+    def __init__(self, buckets=BUCKETS, window=1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def quantiles(self, quantiles=QUANTILES):
+        recent = sorted(self.recent)
+        if not recent:
+            return {q: float("nan") for q in quantiles}
+        # Nearest rank
+        return {q: recent[max(math.ceil(q * len(recent)) - 1, 0)] for q in quantiles}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Per-process timings of Dash callbacks and of the stages inside them.
+
+    Callbacks are wrapped with timed_callback and stages are timed with the stage
+    context manager. Stages may nest: each one records its own time without that of
+    the stages inside it, so the stages of a request add up to its total. Stages
+    may also run outside the callback, such as the serialization of its output.
+    When the Flask request is timed too (start_request/finish_request), the rest of
+    the time Dash spends outside the callback, mostly decoding the request, is
+    recorded as the "dispatch" stage.
+
+    Parameters:
+    - prefix (str): Prefix of the exported metric names.
+    - slow_request_seconds (float): Requests slower than this are logged with their
+                                    stage breakdown, None to log none.
+    """
+
+    def __init__(self, prefix="trading_signal", slow_request_seconds=None):
+        self.prefix = prefix
+        self.slow_request_seconds = slow_request_seconds
+
+        self._callbacks = defaultdict(Histogram)
+        self._stages = defaultdict(Histogram)
+        self._gauges = {}
+        self._lock = threading.Lock()
+        # State of the request being served by the current thread
+        self._local = threading.local()
+
+    def _state(self):
+        local = self._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+            local.request_start = None
+            local.callback = None
+            local.callback_seconds = 0.0
+            local.in_callback = False
+            local.outside_seconds = 0.0
+            local.breakdown = defaultdict(float)
+        return local
+
+    def _observe(self, histograms, key, seconds):
+        with self._lock:
+            histograms[key].observe(seconds)
+
+    def _reset(self, local):
+        local.request_start = None
+        local.callback = None
+        local.callback_seconds = 0.0
+        local.in_callback = False
+        local.outside_seconds = 0.0
+        local.breakdown = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time the enclosed block as a stage of the current callback.
+        """
+        local = self._state()
+        local.stack.append(0.0)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            own = elapsed - local.stack.pop()
+            if local.stack:
+                local.stack[-1] += elapsed
+            elif not local.in_callback:
+                local.outside_seconds += elapsed
+
+            self._observe(self._stages, (local.callback or "", name), own)
+            local.breakdown[name] += own
+
+    def timed_callback(self, func):
+        """
+        Decorator timing a callback as a whole and breaking it down by stage.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            local = self._state()
+            local.callback = func.__name__
+            local.in_callback = True
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                local.in_callback = False
+                self._observe(self._callbacks, func.__name__, elapsed)
+                local.callback_seconds = elapsed
+                if local.request_start is None:
+                    self._log_if_slow(func.__name__, elapsed, local.breakdown)
+                    self._reset(local)
+
+        return wrapper
+
+    def start_request(self):
+        local = self._state()
+        self._reset(local)
+        local.request_start = time.perf_counter()
+
+    def finish_request(self):
+        local = self._state()
+        if local.request_start is None:
+            return
+        elapsed = time.perf_counter() - local.request_start
+        if local.callback is not None:
+            outside = local.callback_seconds + local.outside_seconds
+            dispatch = max(elapsed - outside, 0.0)
+            self._observe(self._stages, (local.callback, "dispatch"), dispatch)
+            local.breakdown["dispatch"] += dispatch
+            self._log_if_slow(local.callback, elapsed, local.breakdown)
+        self._reset(local)
+
+    def _log_if_slow(self, name, seconds, breakdown):
+        if self.slow_request_seconds is None or seconds < self.slow_request_seconds:
+            return
+        stages = ", ".join(
+            f"{stage} {elapsed * 1000:.1f}ms"
+            for stage, elapsed in sorted(breakdown.items(), key=lambda s: -s[1])
+        )
+        other = seconds - sum(breakdown.values())
+        logger.warning(
+            "Slow request %s took %.1fms: %s, other %.1fms",
+            name,
+            seconds * 1000,
+            stages or "no stages",
+            other * 1000,
+        )
+
+    def set_gauge(self, name, value, help_text):
+        """
+        Export a single value, such as the boot time, along with the timings.
+        """
+        with self._lock:
+            self._gauges[name] = (value, help_text)
+
+    def _family(self, name, subject, histograms, labels):
+        lines = [
+            f"# HELP {name} Duration of {subject}.",
+            f"# TYPE {name} histogram",
+        ]
+        recent = [
+            f"# HELP {name}_recent Quantiles of the recent durations of {subject}.",
+            f"# TYPE {name}_recent summary",
+        ]
+        for key, histogram in sorted(histograms.items()):
+            label = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labels, key))
+
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{label}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+            for q, value in histogram.quantiles().items():
+                recent.append(f'{name}_recent{{{label},quantile="{q}"}} {value}')
+            recent.append(f"{name}_recent_sum{{{label}}} {sum(histogram.recent)}")
+            recent.append(f"{name}_recent_count{{{label}}} {len(histogram.recent)}")
+
+        return lines + recent
+
+    def render(self):
+        """
+        Return all timings in the Prometheus text exposition format.
+        """
+        with self._lock:
+            callbacks = {(name,): h for name, h in self._callbacks.items()}
+            lines = self._family(
+                f"{self.prefix}_callback_seconds",
+                "the Dash callbacks",
+                callbacks,
+                ["callback"],
+            ) + self._family(
+                f"{self.prefix}_stage_seconds",
+                "the stages of the Dash callbacks",
+                self._stages,
+                ["callback", "stage"],
+            )
+            for name, (value, help_text) in sorted(self._gauges.items()):
+                lines += [
+                    f"# HELP {self.prefix}_{name} {help_text}",
+                    f"# TYPE {self.prefix}_{name} gauge",
+                    f"{self.prefix}_{name} {value}",
+                ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Return the count and p50/p95/p99 in seconds of every callback and stage.
+        """
+        with self._lock:
+            histograms = {name: h for name, h in self._callbacks.items()}
+            histograms.update(
+                {
+                    f"{callback}/{stage}": h
+                    for (callback, stage), h in self._stages.items()
+                }
+            )
+            return {
+                key: {"count": h.count, **h.quantiles()}
+                for key, h in histograms.items()
+            }
+
+
+metrics = Metrics()
+stage = metrics.stage
+timed_callback = metrics.timed_callback
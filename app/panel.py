@@ -0,0 +1,234 @@
+# -------------
+# Panel mode: one strategy over a universe of tickers aligned on a shared calendar.
+#
+# Arrays are laid out (n_tickers, n_days), i.e. the transpose of the wide frames
+# returned by data.download_many. Missing prices are NaN: a ticker is live from its
+# first price on, and NaNs after that are halts during which the last price holds.
+# -------------
+
+import kernels
+import numpy as np
+import pandas as pd
+
+
+def to_panel(wide):
+    """
+    Convert a wide (dates x tickers) frame such as download_many's into a panel.
+
+    Returns:
+    - values (np.ndarray): float64 array of shape (n_tickers, n_days).
+    """
+    return np.ascontiguousarray(wide.to_numpy(dtype=np.float64).T)
+
+
+def _first_valid(values):
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=-1), valid.argmax(axis=-1), values.shape[-1])
+
+
+def _ffill(values):
+    valid = ~np.isnan(values)
+    pos = np.where(valid, np.arange(values.shape[-1]), 0)
+    np.maximum.accumulate(pos, axis=-1, out=pos)
+    return np.take_along_axis(values, pos, axis=-1)
+
+
+def _justify(values, first):
+    # Shift every row left so that it starts at its first price. Causal indicators
+    # then see each ticker exactly as they would see its own trimmed history.
+    n_days = values.shape[-1]
+    cols = np.minimum(np.arange(n_days) + first[:, None], n_days - 1)
+    return np.take_along_axis(_ffill(values), cols, axis=-1)
+
+
+def _unjustify(values, first, fill):
+    n_days = values.shape[-1]
+    cols = np.arange(n_days) - first[:, None]
+    out = np.take_along_axis(values, np.maximum(cols, 0), axis=-1)
+    return np.where(cols >= 0, out, fill)
+
+
+def panel_MACD_signal(close, a=12, b=26, c=9):
+    """
+    gen_MACD_signal's Buy_Signal for every ticker of a panel.
+
+    Parameters:
+    - close (np.ndarray): Close prices of shape (n_tickers, n_days).
+    - a, b, c (int): Fast, slow and signal line periods.
+
+    Returns:
+    - buy_signal (np.ndarray): Boolean array of shape (n_tickers, n_days), False
+                               before a ticker's first price.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    first = _first_valid(close)
+
+    ema = kernels.ewm_mean(_justify(close, first), [a, b])
+    macd = ema[:, 0] - ema[:, 1]
+    signal_line = kernels.ewm_mean(macd, c)[:, 0]
+
+    return _unjustify(macd > signal_line, first, False)
+
+
+def panel_MA_signal(close, short_window=40, long_window=100):
+    """
+    gen_MA_signal's Buy_Signal for every ticker of a panel.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    first = _first_valid(close)
+
+    means = kernels.rolling_mean(_justify(close, first), [short_window, long_window])
+
+    return _unjustify(means[:, 0] > means[:, 1], first, False)
+
+
+def panel_PSAR_signal(high, low, close, initial_af=0.02, max_af=0.2):
+    """
+    gen_PSAR_signal's Buy_Signal for every ticker of a panel, all tickers advancing
+    through the PSAR state machine together.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    first = _first_valid(close)
+
+    _, _, psarbear = kernels.psar(
+        _justify(np.asarray(high, dtype=np.float64), first),
+        _justify(np.asarray(low, dtype=np.float64), first),
+        _justify(close, first),
+        initial_af,
+        max_af,
+    )
+
+    return _unjustify(np.isnan(psarbear), first, False)
+
+
+def panel_CCI_signal(high, low, close, window_size=20, constant=0.015):
+    """
+    gen_CCI_signal's Buy_Signal for every ticker of a panel.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    first = _first_valid(close)
+
+    typical_price = (
+        _justify(np.asarray(high, dtype=np.float64), first)
+        + _justify(np.asarray(low, dtype=np.float64), first)
+        + _justify(close, first)
+    ) / 3
+    sma = kernels.rolling_mean(typical_price, window_size)[:, 0]
+    # The rolling std runs over all tickers as the columns of one frame
+    deviation = (
+        pd.DataFrame(typical_price.T)
+        .rolling(window=window_size, min_periods=1, center=False)
+        .std()
+        .to_numpy()
+        .T
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cci = (typical_price - sma) / (constant * deviation)
+
+    return _unjustify(cci > 100, first, False)
+
+
+def _row_metrics(total, returns, first, index):
+    # evaluate.py's metrics for every row at once, each over its live bars only
+    n_days = total.shape[-1]
+    rows = np.arange(len(total))
+    live_first = np.minimum(first, n_days - 1)
+
+    n_returns = (~np.isnan(returns)).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(returns, axis=-1) / n_returns
+        squares = np.nansum((returns - mean[:, None]) ** 2, axis=-1)
+        std = np.sqrt(squares / (n_returns - 1))
+        sharpe_ratio = np.where(std != 0, np.sqrt(252) * mean / std, 0.0)
+        # StandardDeviation divides by len(returns) - 1, the leading NaN included
+        standard_deviation = np.sqrt(squares / n_returns)
+
+        days = (index[-1] - index[live_first]).days.to_numpy()
+        cagr = (total[:, -1] / total[rows, live_first]) ** (252.0 / days) - 1
+
+        live = np.arange(n_days) >= first[:, None]
+        peak = np.maximum.accumulate(np.where(live, total, -np.inf), axis=-1)
+        drawdown = np.where(live, total / peak - 1.0, np.nan)
+    max_drawdown = np.nanmin(np.where(live, drawdown, np.inf), axis=-1)
+
+    return {
+        "simple_return": mean,
+        "sharpe_ratio": sharpe_ratio,
+        "cagr": cagr,
+        "standard_deviation": standard_deviation,
+        "max_drawdown": np.where(first < n_days, max_drawdown, np.nan),
+    }
+
+
+def panel_backtest(close, signal, mask=None, initial_capital=100000.0, shares=100):
+    """
+    Backtest one signal panel over a whole universe in a single vectorized pass.
+
+    Every ticker trades its own sleeve like backtest.backtest: initial_capital of
+    cash, shares held while its signal is on. Positions only change on tradable
+    days, so a halted ticker keeps its position and is valued at its last price.
+
+    Parameters:
+    - close (pd.DataFrame): Wide (dates x tickers) close prices, NaN when missing.
+    - signal (np.ndarray or pd.DataFrame): Buy signals of shape (n_tickers, n_days),
+                                           or a wide frame like close.
+    - mask (np.ndarray or pd.DataFrame): Tradable days, e.g. False on halts. Defaults
+                                         to the days with a price.
+    - initial_capital (float): Starting cash of each ticker's sleeve.
+    - shares (int): Number of shares held while the signal is on.
+
+    Returns:
+    - metrics (pd.DataFrame): simple_return, sharpe_ratio, cagr, standard_deviation
+                              and max_drawdown per ticker, plus a "Portfolio" row for
+                              the sum of all sleeves.
+    - portfolio (pd.DataFrame): holdings, cash, total and returns of the sum of all
+                                sleeves, as used by evaluate.py.
+    """
+    index = pd.DatetimeIndex(close.index)
+    tickers = list(close.columns)
+    prices = to_panel(close)
+    if isinstance(signal, pd.DataFrame):
+        signal = to_panel(signal)
+    if mask is None:
+        mask = ~np.isnan(prices)
+    elif isinstance(mask, pd.DataFrame):
+        mask = to_panel(mask).astype(bool)
+
+    first = _first_valid(prices)
+    tradable = mask & ~np.isnan(prices)
+
+    # Target position on tradable days, carried through halts, flat before listing
+    target = np.where(tradable, shares * np.asarray(signal, dtype=np.float64), np.nan)
+    positions = np.nan_to_num(_ffill(target), nan=0.0)
+    prices = np.nan_to_num(_ffill(prices), nan=0.0)
+
+    _, holdings, cash, total, returns = kernels.simulate_portfolio(
+        positions, prices, initial_capital, 1
+    )
+    n_days = len(index)
+    returns[np.arange(n_days) <= first[:, None]] = np.nan
+
+    agg_holdings = holdings.sum(axis=0)
+    agg_cash = cash.sum(axis=0)
+    agg_total = total.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agg_returns = np.append(np.nan, agg_total[1:] / agg_total[:-1] - 1.0)
+
+    metrics = _row_metrics(
+        np.vstack([total, agg_total]),
+        np.vstack([returns, agg_returns]),
+        np.append(first, 0),
+        index,
+    )
+    metrics = pd.DataFrame(metrics, index=pd.Index(tickers + ["Portfolio"]))
+
+    portfolio = pd.DataFrame(
+        {
+            "holdings": agg_holdings,
+            "cash": agg_cash,
+            "total": agg_total,
+            "returns": agg_returns,
+        },
+        index=index,
+    )
+    return metrics, portfolio
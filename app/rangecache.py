@@ -0,0 +1,215 @@
+import datetime
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+
+def _to_timestamp(date):
+    return pd.Timestamp(date).normalize()
+
+
+def _today():
+    return pd.Timestamp(datetime.date.today())
+
+
+class _DictBackend:
+    # Minimal in-process stand-in for the TieredCache get/set/delete interface
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self._data[key] = value
+        return True
+
+    def delete(self, key):
+        return self._data.pop(key, None) is not None
+
+
+class RangeCache:
+    """
+    Cache of date-indexed frames that knows which date ranges it holds.
+
+    Each ticker maps to a list of disjoint [start, end) segments. A request is
+    served by slicing the segments that cover it, only the uncovered gaps are
+    fetched, and the pieces are merged back into a single segment. With
+    recent_days, that segment is split where the recent bars begin, so the short
+    time to live of those bars does not expire the history stored before them.
+
+    Parameters:
+    - fetch (callable): fetch(ticker, start_date, end_date) -> pd.DataFrame with a
+                        DatetimeIndex, where end_date is exclusive.
+    - backend: Object with get(key), set(key, value, timeout=None) and delete(key),
+               such as a tieredcache.TieredCache. Defaults to an in-process dict.
+    - timeout (int): Timeout passed to backend.set, None for the backend default.
+    - recent_days (int): Age in days below which bars are stored in a segment of
+                         their own, None to never split segments.
+    - recent_timeout (int): Timeout of the recent segments, None for timeout.
+    """
+
+    def __init__(
+        self, fetch, backend=None, timeout=None, recent_days=None, recent_timeout=None
+    ):
+        self.fetch = fetch
+        self.backend = backend if backend is not None else _DictBackend()
+        self.timeout = timeout
+        self.recent_days = recent_days
+        self.recent_timeout = timeout if recent_timeout is None else recent_timeout
+
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "partial_hits": 0, "misses": 0}
+        self._stats["gap_fetches"] = 0
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks[ticker]
+
+    def _set(self, key, value, timeout=None):
+        if timeout is None:
+            self.backend.set(key, value)
+        else:
+            self.backend.set(key, value, timeout=timeout)
+
+    def _split(self, start, end):
+        # [start, end) as (start, end, timeout) segments, the recent bars apart
+        if self.recent_days is None:
+            return [(start, end, self.timeout)]
+        boundary = _today() - pd.Timedelta(days=self.recent_days)
+        if end <= boundary:
+            return [(start, end, self.timeout)]
+        if start >= boundary:
+            return [(start, end, self.recent_timeout)]
+        return [(start, boundary, self.timeout), (boundary, end, self.recent_timeout)]
+
+    @staticmethod
+    def _index_key(ticker):
+        return f"range-index:{ticker}"
+
+    @staticmethod
+    def _segment_key(ticker, start, end):
+        return f"range:{ticker}:{start:%Y-%m-%d}:{end:%Y-%m-%d}"
+
+    def _load_segments(self, ticker):
+        # Drop segments whose frames the backend has already evicted
+        segments = []
+        for start, end in self.backend.get(self._index_key(ticker)) or []:
+            start, end = _to_timestamp(start), _to_timestamp(end)
+            frame = self.backend.get(self._segment_key(ticker, start, end))
+            if frame is not None:
+                segments.append((start, end, frame))
+        return segments
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def get(self, ticker, start_date, end_date):
+        """
+        Return the rows of ticker in [start_date, end_date), fetching only the
+        parts of the range that are not cached yet.
+        """
+        ticker = ticker.upper()
+        start, end = _to_timestamp(start_date), _to_timestamp(end_date)
+        # An empty range is answered without looking, so it is not counted
+        if end <= start:
+            return pd.DataFrame()
+        self._count("requests")
+
+        with self._lock(ticker):
+            segments = self._load_segments(ticker)
+
+            # Segments overlapping or touching the request are merged with it
+            touching, others = [], []
+            for seg in segments:
+                if seg[0] <= end and seg[1] >= start:
+                    touching.append(seg)
+                else:
+                    others.append(seg)
+
+            gaps = []
+            cursor = start
+            for seg_start, seg_end, _ in touching:
+                if seg_start > cursor:
+                    gaps.append((cursor, min(seg_start, end)))
+                cursor = max(cursor, seg_end)
+            if cursor < end:
+                gaps.append((cursor, end))
+
+            if not gaps:
+                self._count("hits")
+                # Covered by one segment, or by the history and recent ones together
+                frames = [
+                    frame.loc[(frame.index >= start) & (frame.index < end)]
+                    for _, _, frame in touching
+                ]
+                frames = [frame for frame in frames if len(frame)]
+                if len(frames) > 1:
+                    return pd.concat(frames)
+                return frames[0] if frames else pd.DataFrame()
+
+            self._count("partial_hits" if touching else "misses")
+            self._count("gap_fetches", len(gaps))
+
+            frames = [frame for _, _, frame in touching]
+            for lo, hi in gaps:
+                fetched = self.fetch(ticker, f"{lo:%Y-%m-%d}", f"{hi:%Y-%m-%d}")
+                if len(fetched):
+                    frames.append(
+                        fetched.loc[(fetched.index >= lo) & (fetched.index < hi)]
+                    )
+
+            frames = [frame for frame in frames if len(frame)]
+            if not frames:
+                return pd.DataFrame()
+            merged = pd.concat(frames)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+            # Today's bar is still moving, so it is never recorded as cached
+            merged_start = min([start] + [seg[0] for seg in touching])
+            merged_end = max([min(end, _today())] + [seg[1] for seg in touching])
+            merged_end = max(merged_end, merged_start)
+
+            pieces = []
+            if merged_end > merged_start:
+                pieces = self._split(merged_start, merged_end)
+
+            # A segment that is stored already, typically the history before the
+            # recent bars, is neither deleted nor written again
+            stored = {(seg_start, seg_end) for seg_start, seg_end, _ in touching}
+            kept = {(lo, hi) for lo, hi, _ in pieces} & stored
+            for seg_start, seg_end in stored - kept:
+                self.backend.delete(self._segment_key(ticker, seg_start, seg_end))
+            for lo, hi, timeout in pieces:
+                if (lo, hi) not in kept:
+                    self._set(
+                        self._segment_key(ticker, lo, hi),
+                        merged.loc[(merged.index >= lo) & (merged.index < hi)],
+                        timeout,
+                    )
+            segments = sorted(
+                others + [(lo, hi, None) for lo, hi, _ in pieces],
+                key=lambda seg: seg[0],
+            )
+            self._set(
+                self._index_key(ticker),
+                [(f"{s:%Y-%m-%d}", f"{e:%Y-%m-%d}") for s, e, _ in segments],
+                self.timeout,
+            )
+
+            return merged.loc[(merged.index >= start) & (merged.index < end)]
+
+    def stats(self):
+        """
+        Return the request counters together with the hit rate.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = (
+            stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        return stats
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# frame_token's hex digest, the only tokens that may name a file
+TOKEN_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _as_bytes(values):
+    if values.dtype == object:
+        values = pd.util.hash_array(values)
+    return np.ascontiguousarray(values).view(np.uint8)
+
+
+def frame_token(df):
+    """
+    Content hash of a DataFrame's index, column names and values.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(df.columns)).encode())
+    h.update(_as_bytes(df.index.to_numpy()))
+    for name in df.columns:
+        values = df[name].to_numpy()
+        h.update(str(values.dtype).encode())
+        h.update(_as_bytes(values))
+    return h.hexdigest()
+
+
+class FrameRegistry:
+    """
+    Bounded server-side registry of DataFrames addressed by their content hash.
+
+    The most recently used frames are kept in memory, older ones are spilled to
+    pickles on disk and promoted back on access. The disk tier drops the least
+    recently used pickles, a hit refreshing the pickle's mtime. Frames handed out are shared,
+    so callers must copy before modifying them.
+
+    Parameters:
+    - max_entries (int): Number of frames kept in memory.
+    - directory (str): Directory of the disk tier, shared between worker processes.
+    - max_disk_entries (int): Number of frames kept on disk.
+    """
+
+    def __init__(
+        self, max_entries=16, directory=".frame-registry", max_disk_entries=256
+    ):
+        self.max_entries = max_entries
+        self.directory = Path(directory)
+        self.max_disk_entries = max_disk_entries
+
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, token):
+        return self.directory / f"{token}.pkl"
+
+    def _spill(self, token, df):
+        path = self._path(token)
+        if path.exists():
+            os.utime(path)
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp-{os.getpid()}-{threading.get_ident()}")
+        df.to_pickle(tmp)
+        tmp.replace(path)
+
+        spilled = sorted(self.directory.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        for stale in spilled[: max(len(spilled) - self.max_disk_entries, 0)]:
+            stale.unlink(missing_ok=True)
+
+    def put(self, df):
+        """
+        Register a frame and return its token.
+        """
+        token = frame_token(df)
+        with self._lock:
+            self._frames[token] = df
+            self._frames.move_to_end(token)
+            evicted = []
+            while len(self._frames) > self.max_entries:
+                evicted.append(self._frames.popitem(last=False))
+        for old_token, old_df in evicted:
+            self._spill(old_token, old_df)
+        return token
+
+    def get(self, token):
+        """
+        Return the frame registered under token, or None if it is no longer held.
+        """
+        # Tokens come back from the client and must not reach the filesystem as is
+        if not isinstance(token, str) or not TOKEN_PATTERN.fullmatch(token):
+            return None
+        with self._lock:
+            df = self._frames.get(token)
+            if df is not None:
+                self._frames.move_to_end(token)
+                return df
+        path = self._path(token)
+        try:
+            df = pd.read_pickle(path)
+            os.utime(path)
+        except (FileNotFoundError, EOFError):
+            return None
+        self.put(df)
+        return df
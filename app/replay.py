@@ -0,0 +1,90 @@
+import functools
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+@functools.lru_cache(maxsize=8)
+def load_feed(path):
+    """
+    Read a local OHLCV file once per process. Feeds are read-only, so every
+    client replaying the same file shares it.
+    """
+    return ReplayFeed(path)
+
+
+class ReplayFeed:
+    """
+    Bars of a local OHLCV file replayed against the wall clock.
+
+    Replays are stateless on the server: a client only keeps the time it started
+    and how many bars it has received, and each poll returns the bars that fell
+    due in between.
+
+    Parameters:
+    - path (str): CSV or pickle file with a datetime index and Open, High, Low,
+                  Close and Volume columns, e.g. written by DataFrame.to_csv.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        if path.suffix in (".pkl", ".pickle"):
+            df = pd.read_pickle(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+
+        self.path = str(path)
+        self.index = np.datetime_as_string(
+            pd.DatetimeIndex(df.index).to_numpy(), unit="s"
+        )
+        self.values = {
+            name: df[name].to_numpy(dtype=np.float64).tolist() for name in FIELDS
+        }
+
+    def __len__(self):
+        return len(self.index)
+
+    def due(self, started_at, speed, now=None):
+        """
+        Number of bars due speed bars per second after started_at (epoch seconds).
+        """
+        now = time.time() if now is None else now
+        return min(len(self), max(int((now - started_at) * speed), 0))
+
+    def due_at(self, started_at, speed, cursor):
+        """
+        Epoch seconds at which bar cursor - 1 fell due.
+        """
+        return started_at + cursor / speed
+
+    def extend_data(self, start, stop, max_points):
+        """
+        extendData payloads appending bars [start, stop) to the replay figures.
+
+        Returns:
+        - line (list): Update of the Close line and Volume bar traces.
+        - candlestick (list): Update of the candlestick trace.
+        """
+        x = self.index[start:stop].tolist()
+        values = {name: column[start:stop] for name, column in self.values.items()}
+        line = [
+            {"x": [x, x], "y": [values["Close"], values["Volume"]]},
+            [0, 1],
+            max_points,
+        ]
+        candlestick = [
+            {
+                "x": [x],
+                "open": [values["Open"]],
+                "high": [values["High"]],
+                "low": [values["Low"]],
+                "close": [values["Close"]],
+            },
+            [0],
+            max_points,
+        ]
+        return line, candlestick
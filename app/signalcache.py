@@ -0,0 +1,109 @@
+import functools
+import inspect
+import numbers
+import threading
+from collections import OrderedDict
+
+from backtest import gen_CCI_signal, gen_MA_signal, gen_MACD_signal, gen_PSAR_signal
+from metrics import stage
+from registry import frame_token
+from singleflight import single_flight
+
+SIGNAL_FUNCTIONS = {
+    "MACD": gen_MACD_signal,
+    "MA": gen_MA_signal,
+    "PSAR": gen_PSAR_signal,
+    "CCI": gen_CCI_signal,
+}
+
+
+def _normalize(value):
+    # 12 and 12.0 typed into a dbc.Input must hit the same entry
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+class SignalCache:
+    """
+    LRU cache of gen_*_signal results keyed by (data fingerprint, indicator name,
+    normalized parameters) and bounded by the memory used by the cached frames.
+
+    Cached frames are shared, so callers must copy before modifying them.
+
+    Parameters:
+    - max_bytes (int): Memory budget of the cached frames.
+    """
+
+    def __init__(self, max_bytes=256 * 1024**2):
+        self.max_bytes = max_bytes
+
+        self._results = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def key(self, name, df, *args, **kwargs):
+        bound = inspect.signature(SIGNAL_FUNCTIONS[name]).bind(df, *args, **kwargs)
+        bound.apply_defaults()
+        params = tuple(
+            (param, _normalize(value))
+            for param, value in list(bound.arguments.items())[1:]
+        )
+        return frame_token(df), name, params
+
+    def get(self, name, df, *args, **kwargs):
+        """
+        Return SIGNAL_FUNCTIONS[name](df, *args, **kwargs), computing it only once
+        per distinct data and parameters.
+        """
+        key = self.key(name, df, *args, **kwargs)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self._stats["hits"] += 1
+                return result[0]
+            self._stats["misses"] += 1
+
+        # Concurrent misses on the same key, from any worker, share one computation
+        with stage("signal"):
+            df = single_flight.do(
+                f"signal:{key!r}",
+                functools.partial(SIGNAL_FUNCTIONS[name], df, *args, **kwargs),
+            )
+        size = int(df.memory_usage(index=True, deep=True).sum())
+
+        with self._lock:
+            if size <= self.max_bytes and key not in self._results:
+                self._results[key] = (df, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._results.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self._stats["evictions"] += 1
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return the hit/miss/eviction counters, hit rate and memory in use.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._results)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+signal_cache = SignalCache()
+
+
+def cached_signal(name, df, *args, **kwargs):
+    return signal_cache.get(name, df, *args, **kwargs)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Without POSIX file locks, calls are only shared between threads
+    fcntl = None
+
+# Results handed to other processes are removed once this many seconds old
+RESULT_SECONDS = 60
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    De-duplication of concurrent identical work: while a call for a key is in
+    flight, other callers with the same key wait for it and share its result
+    instead of running their own.
+
+    Threads of a process wait on the in-flight call and get its result, or its
+    exception. Processes queue on a lock file in a shared directory, and one that
+    had to wait for a call with the same key reads the result the running process
+    leaves behind for it. When none was left, for example because the running
+    call failed, it runs the call itself.
+
+    Shared results are the same objects for every thread, so callers must copy
+    before modifying them.
+
+    Parameters:
+    - directory (str): Directory of the lock and result files, None to de-duplicate
+                       across threads only, as on platforms without fcntl.
+    """
+
+    def __init__(self, directory=".single-flight"):
+        if directory is None or fcntl is None:
+            self.directory = None
+        else:
+            self.directory = Path(directory)
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "thread_shared": 0, "process_shared": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key, fn):
+        """
+        Return fn(), running it only once for all concurrent callers with the
+        same key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._stats["thread_shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn)
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run(self, key, fn):
+        if self.directory is None:
+            self._count("calls")
+            return fn()
+
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        waiting = self.directory / f"{digest}.waiting"
+        result = self.directory / f"{digest}.result"
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # One lock file per key, so unrelated calls never wait on each other
+        lock_path = self.directory / f"{digest}.lock"
+        with open(lock_path, "a+b") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is running this key
+                waited_since = time.time_ns()
+                waiting.touch()
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                shared = self._read_result(key, result, waited_since)
+                if shared is not None:
+                    self._count("process_shared")
+                    return shared[0]
+
+            self._count("calls")
+            value = fn()
+            if waiting.exists():
+                waiting.unlink(missing_ok=True)
+                self._write_result(key, value, result)
+            else:
+                # Nobody queued behind this call, so its lock file can go. A
+                # process opening it just now runs the key again, nothing worse
+                lock_path.unlink(missing_ok=True)
+            return value
+
+    def _read_result(self, key, path, written_since):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_mtime_ns < written_since:
+                    return None
+                stored_key, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return (value,) if stored_key == key else None
+
+    def _write_result(self, key, value, path):
+        tmp = path.with_suffix(f".tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+        expired = time.time() - RESULT_SECONDS
+        for stale in self.directory.glob("*.result"):
+            try:
+                if stale.stat().st_mtime < expired:
+                    stale.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """
+        Return the number of calls run and of the callers that shared one instead,
+        within this process and from another one.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,196 @@
+import datetime
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _to_timestamp(date):
+    return pd.Timestamp(date).normalize()
+
+
+def _today():
+    return pd.Timestamp(datetime.date.today())
+
+
+# Yahoo symbols such as BRK-B, ^GSPC, EURUSD=X or 0700.HK, never a path
+TICKER_PATTERN = re.compile(r"[A-Z0-9][A-Z0-9.\-^=]{0,31}|\^[A-Z0-9.\-=]{1,31}")
+
+
+class OHLCVStore:
+    """
+    Persistent columnar store holding one directory of memory-mapped .npy arrays
+    per ticker.
+
+    Each write of a ticker goes to a new version directory holding an int64
+    nanosecond index and one array per column. The ticker's meta.json names the
+    current version and records the date range [start, end) that has already been
+    fetched, and is replaced atomically to publish a new version. Requests only
+    download the leading or trailing dates outside that range, and reads slice the
+    mapped arrays directly.
+
+    Parameters:
+    - fetch (callable): fetch(ticker, start_date, end_date) -> pd.DataFrame with a
+                        DatetimeIndex, where end_date is exclusive.
+    - root (str): Directory holding the store.
+    """
+
+    def __init__(self, fetch, root=".ohlcv-store"):
+        self.fetch = fetch
+        self.root = Path(root)
+
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks[ticker.upper()]
+
+    def _ticker_dir(self, ticker):
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.fullmatch(ticker):
+            raise ValueError(f"Invalid ticker {ticker!r}")
+        return self.root / ticker
+
+    def _version_dir(self, ticker, meta):
+        # Stores written before versioning keep their arrays in the ticker directory
+        return self._ticker_dir(ticker) / meta.get("version", "")
+
+    def _load_meta(self, ticker):
+        try:
+            with open(self._ticker_dir(ticker) / "meta.json") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _read_all(self, ticker, meta):
+        return self._slice(ticker, meta, None, None)
+
+    def _slice(self, ticker, meta, start, end):
+        # A concurrent write may remove the version being read, so retry on the
+        # version that replaced it
+        for attempt in range(3):
+            try:
+                return self._read(ticker, meta, start, end)
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                meta = self._load_meta(ticker)
+
+    def _read(self, ticker, meta, start, end):
+        path = self._version_dir(ticker, meta)
+        index = np.load(path / "index.npy", mmap_mode="r")
+
+        lo = 0 if start is None else np.searchsorted(index, start.value, "left")
+        hi = len(index) if end is None else np.searchsorted(index, end.value, "left")
+
+        data = {
+            name: np.array(np.load(path / f"col_{i}.npy", mmap_mode="r")[lo:hi])
+            for i, name in enumerate(meta["columns"])
+        }
+        return pd.DataFrame(
+            data,
+            index=pd.DatetimeIndex(
+                np.array(index[lo:hi]).view("datetime64[ns]"), name=meta["index_name"]
+            ),
+            columns=meta["columns"],
+        )
+
+    def _write(self, ticker, df, start, end):
+        path = self._ticker_dir(ticker)
+        previous = self._load_meta(ticker)
+        version = f"v-{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        (path / version).mkdir(parents=True)
+
+        index = df.index.as_unit("ns").asi8 if len(df) else np.empty(0, np.int64)
+        np.save(path / version / "index.npy", np.ascontiguousarray(index, np.int64))
+        for i, name in enumerate(df.columns):
+            np.save(
+                path / version / f"col_{i}.npy",
+                np.ascontiguousarray(df[name].to_numpy()),
+            )
+
+        meta = {
+            "version": version,
+            "columns": list(df.columns),
+            "index_name": df.index.name,
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+        }
+        # Publish the complete version at once so readers never see a partial one
+        tmp = path / f"meta.json.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        tmp.replace(path / "meta.json")
+
+        if previous is not None and previous.get("version"):
+            shutil.rmtree(path / previous["version"], ignore_errors=True)
+
+    @staticmethod
+    def _covers(meta, start, end):
+        return _to_timestamp(meta["start"]) <= start and end <= _to_timestamp(
+            meta["end"]
+        )
+
+    def _fetch(self, ticker, start, end):
+        df = self.fetch(ticker, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        df.index = pd.DatetimeIndex(df.index).as_unit("ns")
+        return df
+
+    def get(self, ticker, start_date, end_date):
+        """
+        Return the bars of ticker in [start_date, end_date), downloading only the
+        dates the store has not seen yet.
+        """
+        start, end = _to_timestamp(start_date), _to_timestamp(end_date)
+        if end <= start:
+            return pd.DataFrame()
+
+        # Today's bar is still moving, so it is never recorded as fetched
+        covered_end = min(end, _today())
+
+        meta = self._load_meta(ticker)
+        if meta is not None and self._covers(meta, start, end):
+            return self._slice(ticker, meta, start, end)
+
+        # One write per ticker at a time, the first one fetching for the others
+        with self._lock(ticker):
+            meta = self._load_meta(ticker)
+            if meta is None:
+                df = self._fetch(ticker, start, end)
+                if len(df) == 0:
+                    return df
+                self._write(ticker, df, start, max(covered_end, start))
+                return df
+
+            stored_start = _to_timestamp(meta["start"])
+            stored_end = _to_timestamp(meta["end"])
+
+            missing = []
+            if start < stored_start:
+                missing.append((start, stored_start))
+            if end > stored_end:
+                missing.append((stored_end, end))
+
+            if missing:
+                frames = [self._read_all(ticker, meta)]
+                frames += [self._fetch(ticker, lo, hi) for lo, hi in missing]
+                frames = [frame for frame in frames if len(frame)]
+                df = pd.concat(frames)
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+                self._write(
+                    ticker,
+                    df,
+                    min(start, stored_start),
+                    max(covered_end, stored_end),
+                )
+                meta = self._load_meta(ticker)
+
+        return self._slice(ticker, meta, start, end)
@@ -0,0 +1,500 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+# -------------
+# Incremental counterparts of the gen_*_signal functions in backtest.py.
+#
+# Each indicator takes one bar at a time in O(1) and reproduces the batch result
+# exactly: the EWM and rolling window updates below follow the same arithmetic as
+# pandas' ewm(adjust=False) and rolling(min_periods=1) implementations.
+# -------------
+
+
+def _divide(a, b):
+    # Float division with NumPy semantics instead of ZeroDivisionError
+    if b == 0:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _EWM:
+    def __init__(self, span, weighted=math.nan, old_wt=1.0, started=False):
+        self.span = span
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self.old_wt_factor = 1.0 - self.alpha
+
+        self.weighted = weighted
+        self.old_wt = old_wt
+        self.started = started
+
+    def update(self, value):
+        if not self.started:
+            self.started = True
+            self.weighted = value
+            return self.weighted
+
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if value == value:
+                if self.weighted != value:
+                    self.weighted = (
+                        self.old_wt * self.weighted + self.alpha * value
+                    ) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif value == value:
+            self.weighted = value
+        return self.weighted
+
+    def to_dict(self):
+        return {
+            "span": self.span,
+            "weighted": self.weighted,
+            "old_wt": self.old_wt,
+            "started": self.started,
+        }
+
+
+class _RollingWindow(ABC):
+    # Ring buffer of the last `window` values with the add/remove bookkeeping
+    # shared by the rolling mean and variance
+    def __init__(self, window, values=(), state=None):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.state = state or self.reset()
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def add(self, value):
+        pass
+
+    @abstractmethod
+    def remove(self, value):
+        pass
+
+    @abstractmethod
+    def result(self):
+        pass
+
+    def update(self, value):
+        if self.window == 1 or not self.values:
+            # pandas starts over when a window shares nothing with the previous one
+            self.values.clear()
+            self.restart()
+        elif len(self.values) == self.window:
+            self.remove(self.values[0])
+            if self.needs_restart():
+                self.values.popleft()
+                self.restart()
+        self.values.append(value)
+        self.add(value)
+        return self.result()
+
+    def needs_restart(self):
+        return False
+
+    def restart(self):
+        # Recompute the state from the values still in the window
+        self.state = self.reset()
+        for value in self.values:
+            self.add(value)
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "values": list(self.values),
+            "state": dict(self.state),
+        }
+
+
+class _RollingMean(_RollingWindow):
+    def reset(self):
+        return {
+            "nobs": 0,
+            "sum": 0.0,
+            "neg_ct": 0,
+            "comp_add": 0.0,
+            "comp_remove": 0.0,
+            "same": 0,
+            "prev_value": math.nan,
+        }
+
+    def _count_same(self, value):
+        state = self.state
+        if value == state["prev_value"]:
+            state["same"] += 1
+        else:
+            state["same"] = 1
+        state["prev_value"] = value
+
+    def add(self, value):
+        state = self.state
+        if value == value:
+            state["nobs"] += 1
+            y = value - state["comp_add"]
+            t = state["sum"] + y
+            state["comp_add"] = t - state["sum"] - y
+            state["sum"] = t
+            if math.copysign(1.0, value) < 0:
+                state["neg_ct"] += 1
+            self._count_same(value)
+
+    def remove(self, value):
+        state = self.state
+        if value == value:
+            state["nobs"] -= 1
+            y = -value - state["comp_remove"]
+            t = state["sum"] + y
+            state["comp_remove"] = t - state["sum"] - y
+            state["sum"] = t
+            if math.copysign(1.0, value) < 0:
+                state["neg_ct"] -= 1
+
+    def result(self):
+        state = self.state
+        nobs = state["nobs"]
+        if nobs == 0:
+            return math.nan
+        result = state["sum"] / nobs
+        if state["same"] >= nobs:
+            return state["prev_value"]
+        if state["neg_ct"] == 0 and result < 0:
+            return 0.0
+        if state["neg_ct"] == nobs and result > 0:
+            return 0.0
+        return result
+
+
+class _RollingVar(_RollingWindow):
+    def reset(self):
+        return {
+            "nobs": 0,
+            "mean": 0.0,
+            "ssqdm": 0.0,
+            "comp_add": 0.0,
+            "comp_remove": 0.0,
+        }
+
+    def add(self, value):
+        state = self.state
+        if value != value:
+            return
+        state["nobs"] += 1
+        # Welford's update with Kahan compensation
+        prev_mean = state["mean"] - state["comp_add"]
+        y = value - state["comp_add"]
+        t = y - state["mean"]
+        state["comp_add"] = t + state["mean"] - y
+        state["mean"] = state["mean"] + t / state["nobs"]
+        state["ssqdm"] = state["ssqdm"] + (value - prev_mean) * (value - state["mean"])
+
+    def remove(self, value):
+        state = self.state
+        if value != value:
+            return
+        state["nobs"] -= 1
+        if state["nobs"]:
+            prev_mean = state["mean"] - state["comp_remove"]
+            y = value - state["comp_remove"]
+            t = y - state["mean"]
+            state["comp_remove"] = t + state["mean"] - y
+            state["mean"] = state["mean"] - t / state["nobs"]
+            state["ssqdm"] = state["ssqdm"] - (value - prev_mean) * (
+                value - state["mean"]
+            )
+        else:
+            state["mean"] = 0.0
+            state["ssqdm"] = 0.0
+
+    def needs_restart(self):
+        # Cancellation left the sum of squares negative, or a single observation
+        # whose mean is no longer exact
+        return self.state["ssqdm"] < 0 or self.state["nobs"] <= 1
+
+    def result(self):
+        # Sample variance, ddof=1
+        state = self.state
+        nobs = state["nobs"]
+        if nobs <= 1:
+            return math.nan
+        return state["ssqdm"] / (nobs - 1)
+
+
+def _load_window(cls, state):
+    return cls(state["window"], state["values"], dict(state["state"]))
+
+
+def _load_ewm(state):
+    return _EWM(state["span"], state["weighted"], state["old_wt"], state["started"])
+
+
+class StreamingMACD:
+    """
+    Incremental gen_MACD_signal: three EWM states updated once per bar.
+    """
+
+    def __init__(self, a=12, b=26, c=9):
+        self.a, self.b, self.c = a, b, c
+        self.fast = _EWM(a)
+        self.slow = _EWM(b)
+        self.signal = _EWM(c)
+
+    def update(self, bar):
+        """
+        Add one bar (a mapping with a "Close" entry) and return the new values.
+
+        Returns:
+        - values (dict): MACD, Signal_Line and Buy_Signal of the bar.
+        """
+        close = float(bar["Close"])
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(macd)
+        return {
+            "MACD": macd,
+            "Signal_Line": signal_line,
+            "Buy_Signal": macd > signal_line,
+        }
+
+    def to_dict(self):
+        return {
+            "indicator": "MACD",
+            "params": [self.a, self.b, self.c],
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(*state["params"])
+        indicator.fast = _load_ewm(state["fast"])
+        indicator.slow = _load_ewm(state["slow"])
+        indicator.signal = _load_ewm(state["signal"])
+        return indicator
+
+
+class StreamingMA:
+    """
+    Incremental gen_MA_signal: running sums over ring buffers of both windows.
+    """
+
+    def __init__(self, short_window=40, long_window=100):
+        self.short_window, self.long_window = short_window, long_window
+        self.short = _RollingMean(short_window)
+        self.long = _RollingMean(long_window)
+
+    def update(self, bar):
+        """
+        Add one bar (a mapping with a "Close" entry) and return the new values.
+
+        Returns:
+        - values (dict): Short_MA, Long_MA and Buy_Signal of the bar.
+        """
+        close = float(bar["Close"])
+        short_ma = self.short.update(close)
+        long_ma = self.long.update(close)
+        return {
+            "Short_MA": short_ma,
+            "Long_MA": long_ma,
+            "Buy_Signal": short_ma > long_ma,
+        }
+
+    def to_dict(self):
+        return {
+            "indicator": "MA",
+            "params": [self.short_window, self.long_window],
+            "short": self.short.to_dict(),
+            "long": self.long.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(*state["params"])
+        indicator.short = _load_window(_RollingMean, state["short"])
+        indicator.long = _load_window(_RollingMean, state["long"])
+        return indicator
+
+
+class StreamingCCI:
+    """
+    Incremental gen_CCI_signal: running mean and variance of the typical price over
+    one ring buffer each. On windows shorter than 5 bars with repeated prices the
+    deviation can differ from pandas in the last bits.
+    """
+
+    def __init__(self, window_size=20, constant=0.015):
+        self.window_size, self.constant = window_size, constant
+        self.mean = _RollingMean(window_size)
+        self.var = _RollingVar(window_size)
+
+    def update(self, bar):
+        """
+        Add one bar (a mapping with "High", "Low" and "Close" entries) and return
+        the new values.
+
+        Returns:
+        - values (dict): Typical Price, SMA, Mean Deviation, CCI and Buy_Signal of the
+                         bar.
+        """
+        typical_price = (
+            float(bar["High"]) + float(bar["Low"]) + float(bar["Close"])
+        ) / 3
+        sma = self.mean.update(typical_price)
+        var = self.var.update(typical_price)
+        deviation = math.sqrt(var) if var > 0 else (0.0 if var == var else math.nan)
+        cci = _divide(typical_price - sma, self.constant * deviation)
+        return {
+            "Typical Price": typical_price,
+            "SMA": sma,
+            "Mean Deviation": deviation,
+            "CCI": cci,
+            "Buy_Signal": cci > 100,
+        }
+
+    def to_dict(self):
+        return {
+            "indicator": "CCI",
+            "params": [self.window_size, self.constant],
+            "mean": self.mean.to_dict(),
+            "var": self.var.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(*state["params"])
+        indicator.mean = _load_window(_RollingMean, state["mean"])
+        indicator.var = _load_window(_RollingVar, state["var"])
+        return indicator
+
+
+class StreamingPSAR:
+    """
+    Incremental gen_PSAR_signal: the bull / acceleration factor / extreme point
+    state machine of kernels.psar, advanced one bar at a time.
+    """
+
+    def __init__(self, initial_af=0.02, max_af=0.2):
+        self.initial_af, self.max_af = initial_af, max_af
+        self.state = {
+            "n_bars": 0,
+            "bull": True,
+            "af": initial_af,
+            "hp": math.nan,
+            "lp": math.nan,
+            "psar": math.nan,
+            # Highs and lows of the two previous bars, oldest first
+            "highs": [],
+            "lows": [],
+        }
+
+    def update(self, bar):
+        """
+        Add one bar (a mapping with "High", "Low" and "Close" entries) and return
+        the new values.
+
+        Returns:
+        - values (dict): psar, psarbull, psarbear and Buy_Signal of the bar.
+        """
+        high, low = float(bar["High"]), float(bar["Low"])
+        state = self.state
+        i = state["n_bars"]
+
+        if i < 2:
+            # The first two bars seed the SAR and belong to neither trend
+            if i == 0:
+                state["hp"], state["lp"] = high, low
+            psar = float(bar["Close"])
+            values = {"psar": psar, "psarbull": math.nan, "psarbear": math.nan}
+        else:
+            bull, af, hp, lp = state["bull"], state["af"], state["hp"], state["lp"]
+            prev_psar = state["psar"]
+            (high_2, high_1), (low_2, low_1) = state["highs"], state["lows"]
+
+            if bull:
+                psar = prev_psar + af * (hp - prev_psar)
+            else:
+                psar = prev_psar + af * (lp - prev_psar)
+
+            reverse = False
+            if bull:
+                if low < psar:
+                    bull, reverse = False, True
+                    psar, lp, af = hp, low, self.initial_af
+            else:
+                if high > psar:
+                    bull, reverse = True, True
+                    psar, hp, af = lp, high, self.initial_af
+
+            if not reverse:
+                if bull:
+                    if high > hp:
+                        hp = high
+                        af = min(af + self.initial_af, self.max_af)
+                    if low_1 < psar:
+                        psar = low_1
+                    if low_2 < psar:
+                        psar = low_2
+                else:
+                    if low < lp:
+                        lp = low
+                        af = min(af + self.initial_af, self.max_af)
+                    if high_1 > psar:
+                        psar = high_1
+                    if high_2 > psar:
+                        psar = high_2
+
+            state.update(bull=bull, af=af, hp=hp, lp=lp)
+            values = {
+                "psar": psar,
+                "psarbull": psar if bull else math.nan,
+                "psarbear": math.nan if bull else psar,
+            }
+
+        state["n_bars"] = i + 1
+        state["psar"] = psar
+        state["highs"] = (state["highs"] + [high])[-2:]
+        state["lows"] = (state["lows"] + [low])[-2:]
+
+        values["Buy_Signal"] = values["psarbear"] != values["psarbear"]
+        return values
+
+    def to_dict(self):
+        return {
+            "indicator": "PSAR",
+            "params": [self.initial_af, self.max_af],
+            "state": {
+                **self.state,
+                "highs": list(self.state["highs"]),
+                "lows": list(self.state["lows"]),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(*state["params"])
+        indicator.state = {
+            **state["state"],
+            "highs": list(state["state"]["highs"]),
+            "lows": list(state["state"]["lows"]),
+        }
+        return indicator
+
+
+STREAMING_INDICATORS = {
+    "MACD": StreamingMACD,
+    "MA": StreamingMA,
+    "PSAR": StreamingPSAR,
+    "CCI": StreamingCCI,
+}
+
+
+def from_dict(state):
+    """
+    Restore an indicator checkpointed with its to_dict method.
+    """
+    return STREAMING_INDICATORS[state["indicator"]].from_dict(state)
@@ -0,0 +1,207 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import kernels
+import numpy as np
+import pandas as pd
+from backtest import gen_MACD_signal_grid
+
+METRIC_COLUMNS = ["sharpe_ratio", "cagr", "max_drawdown"]
+
+PARAM_NAMES = {
+    "MACD": ["a", "b", "c"],
+    "MA": ["short_window", "long_window"],
+    "PSAR": ["initial_af", "max_af"],
+    "CCI": ["window_size", "constant"],
+}
+
+# Prices of the sweep in the worker process, attached once by _attach
+_shared = {}
+
+
+class SharedOHLCV:
+    """
+    High, Low and Close prices copied once into a shared memory block, so that
+    sweep workers read them in place instead of receiving pickled DataFrames.
+
+    Parameters:
+    - df (pd.DataFrame): Frame with "High", "Low" and "Close" columns.
+    """
+
+    FIELDS = ["High", "Low", "Close"]
+
+    def __init__(self, df):
+        self.shape = (len(self.FIELDS), len(df))
+        size = max(int(np.prod(self.shape)) * 8, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        array = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        array[:] = df[self.FIELDS].to_numpy(dtype=np.float64).T
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(name, shape, days, initial_capital, shares, cci_deviation):
+    # Workers share the parent's resource tracker, which unlinks the block once
+    # the parent closes it
+    shm = shared_memory.SharedMemory(name=name)
+    _shared.update(
+        shm=shm,
+        prices=np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+        days=days,
+        initial_capital=initial_capital,
+        shares=shares,
+        cci_deviation=cci_deviation,
+    )
+
+
+def buy_signals(strategy, params, high, low, close, cci_deviation="std"):
+    """
+    Buy_Signal of gen_<strategy>_signal for every parameter row at once.
+    cci_deviation is the deviation argument of gen_CCI_signal.
+
+    Returns:
+    - buy_signal (np.ndarray): Boolean array of shape (n_params, n_bars).
+    """
+    if strategy == "MACD":
+        return gen_MACD_signal_grid(close, params)[2]
+
+    if strategy == "MA":
+        windows, inverse = np.unique(params.astype(np.int64), return_inverse=True)
+        means = kernels.rolling_mean(close, windows)
+        inverse = inverse.reshape(-1, 2)
+        return means[inverse[:, 0]] > means[inverse[:, 1]]
+
+    if strategy == "PSAR":
+        _, _, psarbear = kernels.psar(high, low, close, params[:, 0], params[:, 1])
+        return np.isnan(psarbear)
+
+    if strategy == "CCI":
+        typical_price = (high + low + close) / 3
+        windows, inverse = np.unique(params[:, 0].astype(np.int64), return_inverse=True)
+        sma = kernels.rolling_mean(typical_price, windows)
+        if cci_deviation == "mad":
+            deviation = kernels.rolling_mean_deviation(typical_price, windows, sma)
+        else:
+            deviation = np.vstack(
+                [
+                    pd.Series(typical_price)
+                    .rolling(window=window, min_periods=1, center=False)
+                    .std()
+                    .to_numpy()
+                    for window in windows
+                ]
+            )
+        inverse = inverse.reshape(-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cci = (typical_price - sma[inverse]) / (params[:, 1:2] * deviation[inverse])
+        return cci > 100
+
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def metric_rows(total, returns, days):
+    """
+    SharpeRatio, CAGR and the largest MaxDrawdown of every portfolio row, in the
+    order of METRIC_COLUMNS.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(returns, axis=-1)
+        std = np.nanstd(returns, axis=-1, ddof=1)
+        sharpe_ratio = np.where(std != 0, np.sqrt(252) * mean / std, 0.0)
+        cagr = (total[:, -1] / total[:, 0]) ** (252.0 / days) - 1
+
+    rolling_max = kernels.rolling_max(total, 252)[:, 0]
+    max_drawdown = (total / rolling_max - 1.0).min(axis=-1)
+
+    return np.column_stack([sharpe_ratio, cagr, max_drawdown])
+
+
+def _run_chunk(strategy, params):
+    high, low, close = _shared["prices"]
+    buy_signal = buy_signals(
+        strategy, params, high, low, close, _shared["cci_deviation"]
+    )
+    _, _, _, total, returns = kernels.simulate_portfolio(
+        buy_signal, close, _shared["initial_capital"], _shared["shares"]
+    )
+    return metric_rows(total, returns, _shared["days"])
+
+
+def make_grid(*values):
+    """
+    Cartesian product of parameter values, e.g. make_grid([12], [26], range(5, 15)).
+    """
+    return list(itertools.product(*values))
+
+
+def run_sweep(
+    df,
+    strategy,
+    grid,
+    max_workers=None,
+    chunk_size=256,
+    initial_capital=100000.0,
+    shares=100,
+    cci_deviation="std",
+):
+    """
+    Backtest every parameter set of a strategy on a process pool.
+
+    The prices are placed in shared memory once. Each task only carries a small
+    array of parameter rows and returns one compact row of metrics per set.
+
+    Parameters:
+    - df (pd.DataFrame): Frame with "High", "Low" and "Close" columns.
+    - strategy (str): "MACD", "MA", "PSAR" or "CCI".
+    - grid (list): Parameter tuples, in the order of the gen_*_signal arguments.
+    - max_workers (int): Number of worker processes, all CPUs by default.
+    - chunk_size (int): Number of parameter sets per task.
+    - initial_capital (float): Starting cash of every backtest.
+    - shares (int): Number of shares held while the signal is on.
+    - cci_deviation (str): deviation argument of gen_CCI_signal, "std" or "mad".
+
+    Returns:
+    - results (pd.DataFrame): One row per parameter set with its parameters, Sharpe
+                              ratio, CAGR and max drawdown (trailing 252 days).
+    """
+    if strategy not in PARAM_NAMES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    params = np.asarray(grid, dtype=np.float64).reshape(-1, len(PARAM_NAMES[strategy]))
+    chunks = [params[i : i + chunk_size] for i in range(0, len(params), chunk_size)]
+    days = (df.index[-1] - df.index[0]).days
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with SharedOHLCV(df) as shared:
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, max(len(chunks), 1)),
+            initializer=_attach,
+            initargs=(
+                shared.name,
+                shared.shape,
+                days,
+                initial_capital,
+                shares,
+                cci_deviation,
+            ),
+        ) as executor:
+            rows = list(executor.map(_run_chunk, itertools.repeat(strategy), chunks))
+
+    metrics = np.vstack(rows) if rows else np.empty((0, len(METRIC_COLUMNS)))
+    results = pd.DataFrame(params, columns=PARAM_NAMES[strategy])
+    results[METRIC_COLUMNS] = metrics
+    return results
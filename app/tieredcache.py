@@ -0,0 +1,286 @@
+import datetime
+import hashlib
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bars younger than this many days (a long weekend) may still be revised
+RECENT_DAYS = 4
+
+# Seconds each data class lives, None for never
+TTLS = {
+    # Completed bars of the past do not change
+    "history": None,
+    # Frames reaching up to the latest completed bar, which may still be revised
+    "latest": 60,
+    # Anything else, such as RangeCache's segment index
+    "other": None,
+}
+
+
+def classify_bars(key, value):
+    """
+    Data class of a cached value: "latest" for frames whose last bar is less than
+    RECENT_DAYS old, "history" for older frames, "other" otherwise.
+    """
+    if not isinstance(value, pd.DataFrame) or not isinstance(
+        value.index, pd.DatetimeIndex
+    ):
+        return "other"
+    if len(value) == 0:
+        return "history"
+    last = value.index[-1].tz_localize(None).normalize()
+    recent = pd.Timestamp(datetime.date.today()) - pd.Timedelta(days=RECENT_DAYS)
+    return "latest" if last >= recent else "history"
+
+
+def _size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class TieredCache:
+    """
+    Two-tier cache with the get/set/delete interface of flask_caching, budgeted in
+    bytes rather than entries.
+
+    Values are kept ready to use in an in-process LRU and written through to a
+    zlib-compressed pickle on disk, shared by worker processes. A value evicted
+    from memory is read back from disk and promoted on its next hit. Each value's
+    time to live comes from its data class, so historical bars never expire while
+    frames holding the latest bar do quickly.
+
+    Parameters:
+    - max_bytes (int): Memory budget of the in-process tier.
+    - directory (str): Directory of the disk tier.
+    - max_disk_bytes (int): Budget of the compressed files on disk, least recently
+                            used first out. Each process accounts for the files
+                            found on its first disk access and its own writes.
+    - ttls (dict): Seconds to live per data class, None for never. Defaults to TTLS.
+    - classify (callable): classify(key, value) -> data class. Defaults to
+                           classify_bars.
+    - compress (int): zlib level of the disk tier.
+    """
+
+    def __init__(
+        self,
+        max_bytes=256 * 1024**2,
+        directory=".tiered-cache",
+        max_disk_bytes=2 * 1024**3,
+        ttls=None,
+        classify=classify_bars,
+        compress=3,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory)
+        self.max_disk_bytes = max_disk_bytes
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.classify = classify
+        self.compress = compress
+
+        # key -> (value, size, expires_at, mtime of its file)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # File name -> size of the disk tier, least recently used first, scanned
+        # from the directory on first use
+        self._files = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expirations": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    def _path(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return self.directory / f"{digest}.pkl.z"
+
+    def _count(self, name, value=1):
+        self._stats[name] += value
+
+    def _expires_at(self, key, value, timeout):
+        if timeout is None:
+            timeout = self.ttls.get(self.classify(key, value))
+        # flask_caching treats a timeout of 0 as never expiring too
+        return time.time() + timeout if timeout else None
+
+    def _mtime(self, key):
+        try:
+            return self._path(key).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _remember(self, key, value, size, expires_at, mtime):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, expires_at, mtime)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._count("memory_evictions")
+
+    def _forget(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _disk_index(self):
+        # Caller holds the lock
+        if self._files is None:
+            files = []
+            for path in self.directory.glob("*.pkl.z"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, path.name, stat.st_size))
+            self._files = OrderedDict((name, size) for _, name, size in sorted(files))
+            self._disk_bytes = sum(self._files.values())
+        return self._files
+
+    def _drop_file(self, path):
+        with self._lock:
+            self._disk_bytes -= self._disk_index().pop(path.name, 0)
+        path.unlink(missing_ok=True)
+
+    def _write(self, key, value, expires_at):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        blob = zlib.compress(
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress
+        )
+        tmp = path.with_suffix(f".tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, "wb") as f:
+            pickle.dump((key, expires_at, blob), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+        stat = path.stat()
+
+        stale = []
+        with self._lock:
+            files = self._disk_index()
+            self._disk_bytes -= files.pop(path.name, 0)
+            files[path.name] = stat.st_size
+            self._disk_bytes += stat.st_size
+            while self._disk_bytes > self.max_disk_bytes and len(files) > 1:
+                name, size = files.popitem(last=False)
+                self._disk_bytes -= size
+                stale.append(name)
+                self._count("disk_evictions")
+        for name in stale:
+            (self.directory / name).unlink(missing_ok=True)
+        return stat.st_mtime_ns
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+                stored_key, expires_at, blob = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if stored_key != key:
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            self._drop_file(path)
+            with self._lock:
+                self._count("expirations")
+            return None
+        with self._lock:
+            if path.name in self._disk_index():
+                self._files.move_to_end(path.name)
+        return pickle.loads(zlib.decompress(blob)), expires_at, mtime
+
+    def get(self, key):
+        """
+        Return the value cached under key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            value, _, expires_at, mtime = entry
+            if expires_at is not None and expires_at <= time.time():
+                self.delete(key)
+                with self._lock:
+                    self._count("expirations")
+                    self._count("misses")
+                return None
+            # The file changes when another worker sets or deletes the key
+            if self._mtime(key) == mtime:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self._count("memory_hits")
+                return value
+
+        found = self._read(key)
+        with self._lock:
+            if found is None:
+                self._forget(key)
+                self._count("misses")
+                return None
+            value, expires_at, mtime = found
+            self._remember(key, value, _size(value), expires_at, mtime)
+            self._count("disk_hits")
+            return value
+
+    def set(self, key, value, timeout=None):
+        """
+        Cache value under key in both tiers. Without a timeout, the time to live
+        of the value's data class applies.
+        """
+        expires_at = self._expires_at(key, value, timeout)
+        mtime = self._write(key, value, expires_at)
+        with self._lock:
+            self._remember(key, value, _size(value), expires_at, mtime)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._forget(key)
+        path = self._path(key)
+        existed = path.exists()
+        self._drop_file(path)
+        return existed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._files = OrderedDict()
+            self._disk_bytes = 0
+        for path in self.directory.glob("*.pkl.z"):
+            path.unlink(missing_ok=True)
+        return True
+
+    def stats(self):
+        """
+        Return the hit/miss/eviction counters, hit ratio and memory in use.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["disk_bytes"] = self._disk_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,141 @@
+import time
+
+import kernels
+import numpy as np
+import pandas as pd
+from sweep import METRIC_COLUMNS, PARAM_NAMES, buy_signals, metric_rows
+
+
+def fold_bounds(n_bars, train_size, test_size, step=None):
+    """
+    Positions of rolling (train, test) windows over n_bars bars.
+
+    Returns:
+    - bounds (list): (train_start, train_end, test_end) tuples, the test window
+                     starting where the train window ends.
+    """
+    step = step or test_size
+    return [
+        (start, start + train_size, min(start + train_size + test_size, n_bars))
+        for start in range(0, n_bars - train_size, step)
+    ]
+
+
+def walk_forward(
+    df,
+    strategy,
+    grid,
+    train_size=504,
+    test_size=126,
+    step=None,
+    score="sharpe_ratio",
+    initial_capital=100000.0,
+    shares=100,
+    cci_deviation="std",
+):
+    """
+    Rolling walk-forward optimisation of a strategy's parameters.
+
+    The buy signals of every parameter set are computed once over the full history.
+    Each fold then only slices them: the parameter set with the best in-sample score
+    is applied to the following test window. Since the indicators are causal,
+    this is the same as recomputing them per fold on all data up to the window.
+
+    Parameters:
+    - df (pd.DataFrame): Frame with "High", "Low" and "Close" columns.
+    - strategy (str): "MACD", "MA", "PSAR" or "CCI".
+    - grid (list): Parameter tuples, in the order of the gen_*_signal arguments.
+    - train_size, test_size (int): Number of bars of the train and test windows.
+    - step (int): Number of bars between folds, test_size by default.
+    - score (str): In-sample metric to maximise, one of METRIC_COLUMNS.
+    - initial_capital (float): Starting cash of the out-of-sample portfolio.
+    - shares (int): Number of shares held while the signal is on.
+    - cci_deviation (str): deviation argument of gen_CCI_signal, "std" or "mad".
+
+    Returns:
+    - folds (pd.DataFrame): One row per fold with its window dates, chosen
+                            parameters, in-sample score, out-of-sample metrics and
+                            the seconds it took. folds.attrs["signal_seconds"] holds
+                            the time of the one-off signal computation.
+    - equity (pd.DataFrame): Stitched out-of-sample portfolio (positions, holdings,
+                             cash, total, returns) over all test windows.
+    """
+    if score not in METRIC_COLUMNS:
+        raise ValueError(f"score must be one of {METRIC_COLUMNS}")
+    params = np.asarray(grid, dtype=np.float64).reshape(-1, len(PARAM_NAMES[strategy]))
+    high, low, close = df[["High", "Low", "Close"]].to_numpy(dtype=np.float64).T
+    index = df.index
+
+    start_time = time.perf_counter()
+    signals = buy_signals(strategy, params, high, low, close, cci_deviation)
+    signal_seconds = time.perf_counter() - start_time
+
+    bounds = fold_bounds(len(df), train_size, test_size, step)
+    if not bounds:
+        raise ValueError("Not enough bars for a single train and test window")
+
+    rows = []
+    chosen = np.zeros(len(df), dtype=bool)
+    for train_start, train_end, test_end in bounds:
+        start_time = time.perf_counter()
+
+        _, _, _, total, returns = kernels.simulate_portfolio(
+            signals[:, train_start:train_end],
+            close[train_start:train_end],
+            initial_capital,
+            shares,
+        )
+        days = (index[train_end - 1] - index[train_start]).days
+        in_sample = metric_rows(total, returns, days)[:, METRIC_COLUMNS.index(score)]
+        best = int(np.nanargmax(np.nan_to_num(in_sample, nan=-np.inf)))
+
+        chosen[train_end:test_end] = signals[best, train_end:test_end]
+
+        _, _, _, total, returns = kernels.simulate_portfolio(
+            signals[best, train_end:test_end],
+            close[train_end:test_end],
+            initial_capital,
+            shares,
+        )
+        days = (index[test_end - 1] - index[train_end]).days
+        out_of_sample = metric_rows(total[None], returns[None], days)[0]
+
+        rows.append(
+            [
+                index[train_start],
+                index[train_end - 1],
+                index[train_end],
+                index[test_end - 1],
+            ]
+            + list(params[best])
+            + [in_sample[best]]
+            + list(out_of_sample)
+            + [time.perf_counter() - start_time]
+        )
+
+    folds = pd.DataFrame(
+        rows,
+        columns=["train_start", "train_end", "test_start", "test_end"]
+        + PARAM_NAMES[strategy]
+        + [f"in_sample_{score}"]
+        + [f"out_of_sample_{metric}" for metric in METRIC_COLUMNS]
+        + ["seconds"],
+    )
+    folds.attrs["signal_seconds"] = signal_seconds
+
+    # One simulation over the stitched signal, so positions carry across folds
+    oos_start, oos_end = bounds[0][1], bounds[-1][2]
+    positions, holdings, cash, total, returns = kernels.simulate_portfolio(
+        chosen[oos_start:oos_end], close[oos_start:oos_end], initial_capital, shares
+    )
+    equity = pd.DataFrame(
+        {
+            "positions": positions,
+            "holdings": holdings,
+            "cash": cash,
+            "total": total,
+            "returns": returns,
+        },
+        index=index[oos_start:oos_end],
+    )
+    return folds, equity